@@ -1,18 +1,21 @@
+import io
 import streamlit as st
 from dotenv import load_dotenv
 load_dotenv()
 
-from modules.pdf_handler import extract_text_from_pdfs
-from modules.chat_engine import create_vectorstore, get_conversation_chain
+from modules.pdf_handler import load_documents, document_set_hash
+from modules.chat_engine import update_vectorstore, get_conversation_chain, ask
 from modules.voice_utils import transcribe_audio, speak_text
 from modules.translate_utils import translate_text
+from modules.answer_cache import get_answer_cache
+from modules.job_queue import submit_job, job_result, show_job_progress, ACTIVE, DONE, CANCELLED
 
 # Set Streamlit page config and title
 st.set_page_config(page_title="Smart PDF Chatbot", layout="wide")
 st.title("📚 PDF Chatbot with Voice & Memory")
 
 # Initialize session state
-for key in ["chat_chain", "chat_history", "spoken_input", "uploaded_text"]:
+for key in ["chat_chain", "chat_history", "spoken_input", "uploaded_text", "vectorstore", "doc_set_hash", "index_job"]:
     if key not in st.session_state:
         st.session_state[key] = None if key != "chat_history" else []
 
@@ -38,14 +41,63 @@ st.sidebar.page_link("pages/1_Summarization.py", label="Go to Summarization", ic
 st.sidebar.page_link("pages/2_Evaluation.py", label="Go to Evaluation", icon="📈")
 st.sidebar.page_link("pages/2_Practice.py", label="Practice Mode", icon="🧠")
 
+if st.session_state.doc_set_hash:
+    stats = get_answer_cache(st.session_state.doc_set_hash).stats()
+    st.sidebar.caption(f"⚡ Answer cache: {stats['hits']} hits / {stats['misses']} misses")
+
 # Main App Functionality
-if st.sidebar.button("🔄 Process PDFs"):
-    with st.spinner("Reading and indexing documents..."):
-        text = extract_text_from_pdfs(pdf_files)
-        st.session_state.uploaded_text = text
-        st.session_state.chat_chain = get_conversation_chain(create_vectorstore(text))
+def process_documents(files, vectorstore, progress):
+    progress(0, len(files), "Reading documents...")
+    documents = load_documents(files)
+    # Reuse the session's index: only added/removed files are (re)indexed
+    vectorstore = update_vectorstore(vectorstore, documents, progress=progress)
+    return {
+        "uploaded_text": "\n".join(doc.text for doc in documents if doc.text).strip(),
+        "vectorstore": vectorstore,
+        "doc_set_hash": document_set_hash(documents),
+        "chat_chain": get_conversation_chain(vectorstore) if vectorstore else None,
+    }
+
+
+# One indexing job per session at a time; it works on its own copy of the index
+if st.sidebar.button("🔄 Process PDFs", disabled=bool(st.session_state.index_job)):
+    # Read the uploads now: the worker runs after this script run has finished
+    files = []
+    for pdf in pdf_files or []:
+        data = io.BytesIO(pdf.getvalue())
+        data.name = pdf.name
+        files.append(data)
+    st.session_state.index_job = submit_job("index", process_documents, files, st.session_state.vectorstore)
+
+
+@st.fragment(run_every=1)
+def index_job_status():
+    job = show_job_progress(st.session_state.index_job, "Indexing")
+    if job is not None and job["status"] in ACTIVE:
+        return
+    st.session_state.index_job = None
+    result = job_result(job["id"]) if job and job["status"] == DONE else None
+    if result is not None:
+        st.session_state.update(result)
         st.session_state.chat_history = []
-    st.sidebar.success("✅ Chatbot is ready!")
+        if result["chat_chain"]:
+            st.session_state.index_notice = ("success", "✅ Chatbot is ready!")
+        else:
+            st.session_state.index_notice = ("warning", "⚠️ No readable text found in the uploaded PDFs.")
+    elif job and job["status"] == CANCELLED:
+        st.session_state.index_notice = ("info", "✖️ Indexing cancelled.")
+    else:
+        error = job["error"] if job else "the job's result is no longer available"
+        st.session_state.index_notice = ("error", f"❌ Indexing failed: {error}")
+    st.rerun()  # whole page: the chat needs the new chain
+
+
+if st.session_state.index_job:
+    with st.sidebar:
+        index_job_status()
+if st.session_state.get("index_notice"):
+    level, notice = st.session_state.pop("index_notice")
+    getattr(st.sidebar, level)(notice)
 
 for sender, msg in st.session_state.chat_history:
     with st.chat_message(sender):
@@ -68,11 +120,36 @@ user_input = st.session_state.spoken_input or typed_input
 
 if user_input and st.session_state.chat_chain:
     st.session_state.chat_history.append(("🧑 You", user_input))
-    with st.spinner("Thinking..."):
-        result = st.session_state.chat_chain({"question": user_input})
-        answer = result['answer']
+    with st.chat_message("🧑 You"):
+        st.markdown(user_input)
+
+    # Stream the answer into the bubble as tokens arrive
+    with st.chat_message("🤖 Bot"):
+        placeholder = st.empty()
+        streamed = []
+
+        def show_token(token):
+            streamed.append(token)
+            placeholder.markdown("".join(streamed) + "▌")
+
+        # Repeated (or near-identical) questions on the same documents skip the LLM.
+        # Only an opening question stands on its own: a follow-up ("explain that
+        # more") means something different in every conversation
+        memory = st.session_state.chat_chain.memory
+        standalone = not memory.load_memory_variables({})["chat_history"]
+        answer_cache = get_answer_cache(st.session_state.doc_set_hash)
+        answer = answer_cache.lookup(user_input) if standalone else None
+        if answer is not None:
+            memory.save_context({"question": user_input}, {"answer": answer})
+        else:
+            result = ask(st.session_state.chat_chain, user_input, on_token=show_token)
+            answer = result['answer']
+            if standalone:
+                answer_cache.store(user_input, answer)
+        placeholder.markdown(answer)
         if lang_code != "en":
-            answer = translate_text(answer, target_lang=lang_code)
+            with st.spinner("Translating..."):
+                answer = translate_text(answer, target_lang=lang_code)
         st.session_state.chat_history.append(("🤖 Bot", answer))
     st.session_state.spoken_input = None
     st.rerun()
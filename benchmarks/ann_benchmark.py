@@ -0,0 +1,53 @@
+# benchmarks/ann_benchmark.py
+# Recall@k and query latency of each FAISS index type against the flat baseline,
+# on a synthetic clustered corpus shaped like our chunk embeddings.
+#
+#   python -m benchmarks.ann_benchmark --vectors 100000 --dim 768
+import time
+import argparse
+import numpy as np
+
+from modules.ann_index import build_index
+
+
+def synthetic_corpus(num_vectors, dim, num_queries, clusters=200, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(clusters, size=num_vectors + num_queries)
+    points = centers[labels] + 0.3 * rng.normal(size=(len(labels), dim)).astype(np.float32)
+    return points[:num_vectors], points[num_vectors:]
+
+
+def run(index_type, corpus, queries, k):
+    start = time.perf_counter()
+    index = build_index(corpus, index_type)
+    index.add(corpus)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, ids = index.search(queries, k)
+    query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return type(index).__name__, ids, build_seconds, query_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    corpus, queries = synthetic_corpus(args.vectors, args.dim, args.queries)
+    _, truth, _, _ = run("flat", corpus, queries, args.k)
+
+    print(f"{args.vectors} vectors x {args.dim} dims, {args.queries} queries, k={args.k}")
+    print(f"{'type':<8} {'index':<16} {'recall@k':>9} {'build s':>9} {'ms/query':>9}")
+    for index_type in ["flat", "ivf", "hnsw", "ivfpq"]:
+        name, ids, build_seconds, query_ms = run(index_type, corpus, queries, args.k)
+        recall = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(ids, truth)])
+        print(f"{index_type:<8} {name:<16} {recall:>9.3f} {build_seconds:>9.2f} {query_ms:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# modules/ann_index.py
+import os
+import math
+import numpy as np
+import faiss
+
+# "auto" picks by corpus size; or force one of: flat, ivf, hnsw, ivfpq
+INDEX_TYPE = os.environ.get("INDEX_TYPE", "auto")
+AUTO_HNSW_MIN_CHUNKS = int(os.environ.get("AUTO_HNSW_MIN_CHUNKS", 20_000))
+AUTO_IVFPQ_MIN_CHUNKS = int(os.environ.get("AUTO_IVFPQ_MIN_CHUNKS", 200_000))
+
+# Recall/latency knobs: higher = better recall, slower queries
+IVF_NPROBE = int(os.environ.get("IVF_NPROBE", 16))
+HNSW_M = int(os.environ.get("HNSW_M", 32))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("HNSW_EF_CONSTRUCTION", 80))
+HNSW_EF_SEARCH = int(os.environ.get("HNSW_EF_SEARCH", 64))
+PQ_SUBQUANTIZERS = int(os.environ.get("PQ_SUBQUANTIZERS", 32))
+PQ_BITS = 8
+
+
+def index_settings(index_type=INDEX_TYPE):
+    """Settings that shape a built index; query-time knobs are applied by tune_index."""
+    return (
+        index_type, AUTO_HNSW_MIN_CHUNKS, AUTO_IVFPQ_MIN_CHUNKS,
+        HNSW_M, HNSW_EF_CONSTRUCTION, PQ_SUBQUANTIZERS, PQ_BITS,
+    )
+
+
+def choose_index_type(num_vectors, index_type=INDEX_TYPE):
+    if index_type != "auto":
+        return index_type
+    if num_vectors >= AUTO_IVFPQ_MIN_CHUNKS:
+        return "ivfpq"
+    if num_vectors >= AUTO_HNSW_MIN_CHUNKS:
+        return "hnsw"
+    return "flat"
+
+
+def effective_index_type(num_vectors, index_type=INDEX_TYPE):
+    """The type build_index actually produces for this many vectors."""
+    kind = choose_index_type(num_vectors, index_type)
+    # Quantized indexes need enough training points; fall back to exact search
+    if kind == "ivfpq" and num_vectors < 2 ** PQ_BITS * 39:
+        kind = "ivf"
+    if kind == "ivf" and num_vectors < 39:
+        kind = "flat"
+    return kind
+
+
+def index_type_of(index):
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivfpq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def _nlist(num_vectors):
+    # Rule of thumb: ~4*sqrt(n) lists, each with enough points to train on
+    return max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39))
+
+
+def _pq_subquantizers(dim):
+    m = min(PQ_SUBQUANTIZERS, dim)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def tune_index(index):
+    """Apply the query-time recall/latency settings (also after loading from disk)."""
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = IVF_NPROBE
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    return index
+
+
+def build_index(vectors, index_type=INDEX_TYPE):
+    """Create a trained, empty FAISS index (L2) suited to `vectors`; add them separately."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    num_vectors, dim = vectors.shape
+    kind = effective_index_type(num_vectors, index_type)
+
+    if kind == "flat":
+        return faiss.IndexFlatL2(dim)
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        return tune_index(index)
+    if kind == "ivf":
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, _nlist(num_vectors))
+    elif kind == "ivfpq":
+        index = faiss.IndexIVFPQ(
+            faiss.IndexFlatL2(dim), dim, _nlist(num_vectors), _pq_subquantizers(dim), PQ_BITS
+        )
+    else:
+        raise ValueError(f"Unknown index type: {kind}")
+    index.train(vectors)
+    return tune_index(index)
+
+
+def supports_removal(index):
+    # Only flat indexes renumber the remaining vectors to 0..n-1 on removal, as
+    # the vectorstore's id mapping assumes; HNSW can't remove at all. The rest
+    # are rebuilt instead
+    return isinstance(index, faiss.IndexFlat)
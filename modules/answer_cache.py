@@ -0,0 +1,97 @@
+# modules/answer_cache.py
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from modules.model_registry import get_sentence_transformer
+
+ANSWER_CACHE_TTL_SECONDS = int(os.environ.get("ANSWER_CACHE_TTL_SECONDS", 24 * 3600))
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", 256))
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", 0.92))
+
+_caches = OrderedDict()  # document-set hash -> AnswerCache, shared by every session
+MAX_DOCUMENT_SETS = 64
+_caches_lock = threading.Lock()
+
+
+def normalize_question(question):
+    question = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(question.split())
+
+
+class AnswerCache:
+    """Question -> answer cache for one document set.
+
+    Matches exact normalized questions first, then near-duplicates whose
+    embedding cosine similarity reaches `threshold`. Entries expire after
+    `ttl` seconds and the least recently used are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl=ANSWER_CACHE_TTL_SECONDS,
+                 threshold=ANSWER_CACHE_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.entries = OrderedDict()  # normalized question -> (answer, unit vector, created)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _embed(self, text):
+        return get_sentence_transformer().encode([text], normalize_embeddings=True)[0]
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for key in [k for k, (_, _, created) in self.entries.items() if created < cutoff]:
+            del self.entries[key]
+
+    def lookup(self, question):
+        key = normalize_question(question)
+        with self._lock:
+            self._expire()
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            if not self.entries:
+                self.misses += 1
+                return None
+            keys = list(self.entries)
+            matrix = np.stack([self.entries[k][1] for k in keys])
+
+        # Near-duplicate: one matrix-vector product over every cached question
+        scores = matrix @ self._embed(key)
+        best = int(np.argmax(scores))
+        with self._lock:
+            if scores[best] >= self.threshold and keys[best] in self.entries:
+                self.entries.move_to_end(keys[best])
+                self.hits += 1
+                return self.entries[keys[best]][0]
+            self.misses += 1
+        return None
+
+    def store(self, question, answer):
+        key = normalize_question(question)
+        vector = self._embed(key)
+        with self._lock:
+            self.entries[key] = (answer, vector, time.time())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+def get_answer_cache(doc_set_hash):
+    with _caches_lock:
+        if doc_set_hash not in _caches:
+            _caches[doc_set_hash] = AnswerCache()
+            while len(_caches) > MAX_DOCUMENT_SETS:
+                _caches.popitem(last=False)
+        _caches.move_to_end(doc_set_hash)
+        return _caches[doc_set_hash]
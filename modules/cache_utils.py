@@ -0,0 +1,190 @@
+# modules/cache_utils.py
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+
+# Root directory for every on-disk cache (override with PDF_ASSISTANT_CACHE_DIR)
+CACHE_DIR = os.environ.get(
+    "PDF_ASSISTANT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache"),
+)
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def cache_path(*parts):
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def path_lock(path):
+    """Return the process-wide lock guarding a cache path (shared by all sessions)."""
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(path), threading.RLock())
+
+
+# -----------------------------
+# Content Hashing
+# -----------------------------
+def content_hash(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        elif not isinstance(part, (bytes, bytearray)):
+            part = repr(part).encode("utf-8")
+        # Length prefix keeps ("ab", "c") and ("a", "bc") apart
+        h.update(len(part).to_bytes(8, "little"))
+        h.update(part)
+    return h.hexdigest()
+
+
+def file_bytes(file):
+    """Read the raw bytes of an uploaded file without disturbing its read pointer."""
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    pos = file.tell()
+    file.seek(0)
+    data = file.read()
+    file.seek(pos)
+    return data
+
+
+# -----------------------------
+# Directory Entries with LRU Eviction
+# -----------------------------
+def _dir_size(path):
+    total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def touch(path):
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def evict_lru(directory, max_bytes=None, max_entries=None, keep=()):
+    """Delete least recently used entries of `directory` until it fits the bounds.
+
+    Entries are the immediate children (files or sub-directories); their mtime is
+    the recency marker, refreshed with `touch` on every hit. Names in `keep` are
+    never evicted.
+    """
+    with path_lock(directory):
+        entries = []
+        for name in os.listdir(directory):
+            if name.startswith(".tmp-"):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            size = _dir_size(path) if os.path.isdir(path) else os.path.getsize(path)
+            entries.append((mtime, name, path, size))
+
+        entries.sort()
+        total = sum(e[3] for e in entries)
+        count = len(entries)
+        for _, name, path, size in entries:
+            over_size = max_bytes is not None and total > max_bytes
+            over_count = max_entries is not None and count > max_entries
+            if not (over_size or over_count):
+                break
+            if name in keep:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+            total -= size
+            count -= 1
+
+
+# -----------------------------
+# Key/Value Blob Store (SQLite)
+# -----------------------------
+class DiskCache:
+    """Size-bounded, LRU-evicted key -> bytes store shared across sessions and processes."""
+
+    def __init__(self, name, max_bytes=512 * 1024 ** 2):
+        self.path = os.path.join(cache_path(name), "cache.db")
+        self.max_bytes = max_bytes
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+
+    def _connect(self):
+        # One short-lived connection per call keeps this safe across threads
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._connect() as conn:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                marks = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({marks})", batch
+                ).fetchall()
+                found.update(rows)
+                if rows:
+                    conn.executemany(
+                        "UPDATE entries SET accessed = ? WHERE key = ?",
+                        [(time.time(), k) for k, _ in rows],
+                    )
+        return found
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def set_many(self, items):
+        if not items:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                [(k, sqlite3.Binary(v), len(v), now) for k, v in items.items()],
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used rows until back under 90% of the bound
+        excess = total - int(self.max_bytes * 0.9)
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
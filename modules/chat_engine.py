@@ -2,36 +2,252 @@ import os
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 
 # Now import everything else
-from langchain_community.llms import Ollama
+import numpy as np
+import faiss
 from langchain.text_splitter import CharacterTextSplitter
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import OllamaEmbeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain.chains import ConversationalRetrievalChain
 from langchain.memory import ConversationBufferMemory
+from langchain_core.callbacks import BaseCallbackHandler
 
+from modules.cache_utils import content_hash
+from modules.index_cache import load_index, save_index, read_index_file
+from modules.hybrid_retriever import BM25Index, HybridRetriever
+from modules.chat_memory import MEMORY_MODE, BoundedSummaryMemory
+from modules.ann_index import (
+    index_settings, build_index, tune_index, supports_removal, effective_index_type, index_type_of,
+)
+from modules.embedding_cache import CachedEmbeddings, EMBED_BATCH_SIZE
+from modules.ollama_client import PooledOllama, PooledOllamaEmbeddings, get_client
 
-def create_vectorstore(text):
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+EMBEDDING_MODEL = "nomic-embed-text"
+CHAT_MODEL = "gemma3:1b"
+
+BM25_FILE = "bm25.json"
+
+# Tag carried by the answer-generating LLM, so streaming skips the condense-question call
+ANSWER_TAG = "answer"
+
+
+def _embeddings():
+    # Use your existing nomic-embed-text model, with per-chunk vector reuse
+    return CachedEmbeddings(PooledOllamaEmbeddings(EMBEDDING_MODEL), EMBEDDING_MODEL)
+
+
+def _index_key(doc_hashes):
+    # Same set of documents + same splitter/model/index settings -> same saved index
+    return content_hash(
+        *sorted(set(doc_hashes)),
+        "faiss", CHUNK_SIZE, CHUNK_OVERLAP, EMBEDDING_MODEL, *index_settings(),
+    )
+
+
+def _document_chunks(doc):
+    """Split one ParsedDocument page by page; chunk ids are "<doc hash>:<n>"."""
     splitter = CharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP
+    )
+    pages = [(n + 1, text) for n, text in enumerate(doc.pages) if text.strip()]
+    chunks = splitter.create_documents(
+        [text for _, text in pages],
+        metadatas=[{"source": doc.name, "page": page, "doc_hash": doc.hash} for page, _ in pages],
     )
-    chunks = splitter.split_text(text)
+    ids = [f"{doc.hash}:{i}" for i in range(len(chunks))]
+    return chunks, ids
 
-    # Use your existing nomic-embed-text model
-    embeddings = OllamaEmbeddings(model="nomic-embed-text")
 
-    vectorstore = FAISS.from_texts(chunks, embeddings)
+def _load(key):
+    """Load a cached index together with its persisted BM25 index."""
+    vectorstore = load_index(key, _embeddings())
+    if vectorstore is not None:
+        tune_index(vectorstore.index)
+        data = read_index_file(key, BM25_FILE)
+        bm25 = BM25Index.from_bytes(data) if data else None
+        vectorstore.bm25 = bm25 or BM25Index.from_vectorstore(vectorstore)
     return vectorstore
 
-def get_conversation_chain(vectorstore):
+
+def _save(key, vectorstore):
+    save_index(key, vectorstore, extra_files={BM25_FILE: vectorstore.bm25.to_bytes()})
+
+
+def indexed_documents(vectorstore):
+    """Hashes of the documents currently held by `vectorstore`."""
+    return {chunk_id.split(":", 1)[0] for chunk_id in vectorstore.index_to_docstore_id.values()}
+
+
+def add_document(vectorstore, doc):
+    chunks, ids = _document_chunks(doc)
+    if chunks:
+        vectorstore.add_documents(chunks, ids=ids)
+        for chunk, chunk_id in zip(chunks, ids):
+            vectorstore.bm25.add(chunk_id, chunk.page_content)
+
+
+def remove_document(vectorstore, doc_hash):
+    ids = [i for i in vectorstore.index_to_docstore_id.values() if i.startswith(doc_hash + ":")]
+    if ids:
+        for chunk_id in ids:
+            vectorstore.bm25.remove(chunk_id, vectorstore.docstore.search(chunk_id).page_content)
+        if supports_removal(vectorstore.index):
+            vectorstore.delete(ids)
+        else:
+            doomed = set(ids)
+            _rebuild(vectorstore, [i for i in _chunk_ids(vectorstore) if i not in doomed])
+            vectorstore.docstore.delete(ids)
+
+
+def _chunk_ids(vectorstore):
+    return [chunk_id for _, chunk_id in sorted(vectorstore.index_to_docstore_id.items())]
+
+
+def _rebuild(vectorstore, chunk_ids):
+    """Re-index `chunk_ids` into a fresh index of the type their count calls for.
+
+    Vectors come back from the embedding cache (quantized indexes can't
+    return the originals), so this costs no model calls.
+    """
+    texts = [vectorstore.docstore.search(chunk_id).page_content for chunk_id in chunk_ids]
+    vectors = np.asarray(vectorstore.embedding_function.embed_documents(texts), dtype=np.float32)
+    vectors = vectors.reshape(len(chunk_ids), vectorstore.index.d)
+    index = build_index(vectors)
+    index.add(vectors)
+    vectorstore.index = index
+    vectorstore.index_to_docstore_id = dict(enumerate(chunk_ids))
+
+
+def _refit_index(vectorstore):
+    # Incremental adds/removes can move the corpus into another size tier
+    if index_type_of(vectorstore.index) != effective_index_type(vectorstore.index.ntotal):
+        _rebuild(vectorstore, _chunk_ids(vectorstore))
+
+
+def create_vectorstore(documents, progress=None):
+    """Build (or load from the index cache) a vectorstore over ParsedDocuments.
+
+    `progress(done, total, message)` is called after each batch of chunks is embedded.
+    """
+    documents = [doc for doc in documents if doc.text]
+    if not documents:
+        return None
+    key = _index_key(doc.hash for doc in documents)
+    vectorstore = _load(key)
+    if vectorstore is not None:
+        return vectorstore
+
+    chunks, ids = [], []
+    for doc in {doc.hash: doc for doc in documents}.values():
+        doc_chunks, doc_ids = _document_chunks(doc)
+        chunks.extend(doc_chunks)
+        ids.extend(doc_ids)
+
+    # Embed first so the index type (flat / IVF / HNSW / IVF-PQ) can fit the corpus
+    embeddings = _embeddings()
+    texts = [chunk.page_content for chunk in chunks]
+    vectors = []
+    for start in range(0, len(texts), EMBED_BATCH_SIZE):
+        vectors.extend(embeddings.embed_documents(texts[start:start + EMBED_BATCH_SIZE]))
+        if progress:
+            progress(len(vectors), len(texts), f"Embedded chunk {len(vectors)}/{len(texts)}")
+    vectorstore = FAISS(
+        embedding_function=embeddings,
+        index=build_index(vectors),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+    )
+    vectorstore.add_embeddings(
+        zip(texts, vectors),
+        metadatas=[chunk.metadata for chunk in chunks],
+        ids=ids,
+    )
+    # Sparse index is built once here and persisted next to the vectors
+    vectorstore.bm25 = BM25Index()
+    for chunk, chunk_id in zip(chunks, ids):
+        vectorstore.bm25.add(chunk_id, chunk.page_content)
+    _save(key, vectorstore)
+    return vectorstore
+
+
+def copy_vectorstore(vectorstore):
+    """Independent copy of a vectorstore and its BM25 index (documents are shared)."""
+    copy = FAISS(
+        embedding_function=vectorstore.embedding_function,
+        index=tune_index(faiss.clone_index(vectorstore.index)),
+        docstore=InMemoryDocstore(dict(vectorstore.docstore._dict)),
+        index_to_docstore_id=dict(vectorstore.index_to_docstore_id),
+    )
+    copy.bm25 = BM25Index.from_bytes(vectorstore.bm25.to_bytes())
+    return copy
+
+
+def update_vectorstore(vectorstore, documents, progress=None):
+    """Return a vectorstore covering exactly `documents`, derived from `vectorstore`.
+
+    Only new files are chunked and embedded and only dropped files are
+    deleted, so the cost tracks the change rather than the corpus. The
+    changes go to a copy: the given store can keep serving queries (and a
+    concurrent reader never sees a half-updated index).
+    """
+    documents = [doc for doc in documents if doc.text]
+    if vectorstore is None or not documents:
+        return create_vectorstore(documents, progress)
+
+    key = _index_key(doc.hash for doc in documents)
+    cached = _load(key)
+    if cached is not None:
+        return cached
+
+    vectorstore = copy_vectorstore(vectorstore)
+    wanted = {doc.hash: doc for doc in documents}
+    current = indexed_documents(vectorstore)
+    for doc_hash in current - wanted.keys():
+        remove_document(vectorstore, doc_hash)
+    added = wanted.keys() - current
+    for n, doc_hash in enumerate(added, 1):
+        add_document(vectorstore, wanted[doc_hash])
+        if progress:
+            progress(n, len(added), f"Indexed {wanted[doc_hash].name}")
+    _refit_index(vectorstore)
+
+    _save(key, vectorstore)
+    return vectorstore
+
+def get_conversation_chain(vectorstore, memory_mode=MEMORY_MODE):
     # Use gemma3:1b as LLM
-    llm = Ollama(model="gemma3:1b")
+    llm = PooledOllama(model=CHAT_MODEL, tags=[ANSWER_TAG])
+    condense_llm = PooledOllama(model=CHAT_MODEL)
+    get_client().warm_up(CHAT_MODEL)  # load it while the user types the first question
 
-    memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    if memory_mode == "buffer":
+        memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    else:
+        # Bounded history: per-turn prompt size stays flat over long sessions
+        memory = BoundedSummaryMemory(llm=condense_llm, memory_key="chat_history", return_messages=True)
 
     chain = ConversationalRetrievalChain.from_llm(
         llm=llm,
-        retriever=vectorstore.as_retriever(),
+        condense_question_llm=condense_llm,
+        retriever=HybridRetriever(vectorstore=vectorstore, bm25=vectorstore.bm25),
         memory=memory
     )
     return chain
+
+
+class AnswerStreamHandler(BaseCallbackHandler):
+    """Forward tokens of the final answer (not the rephrased question) to `on_token`."""
+
+    def __init__(self, on_token):
+        self.on_token = on_token
+
+    def on_llm_new_token(self, token, *, tags=None, **kwargs):
+        if tags and ANSWER_TAG in tags:
+            self.on_token(token)
+
+
+def ask(chain, question, on_token=None):
+    callbacks = [AnswerStreamHandler(on_token)] if on_token else []
+    return chain.invoke({"question": question}, config={"callbacks": callbacks})
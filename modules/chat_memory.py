@@ -0,0 +1,107 @@
+# modules/chat_memory.py
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from pydantic import PrivateAttr
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.memory.prompt import SUMMARY_PROMPT
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.messages import SystemMessage, get_buffer_string
+
+# "summary" keeps prompts within MEMORY_TOKEN_BUDGET; "buffer" keeps every turn verbatim
+MEMORY_MODE = os.environ.get("MEMORY_MODE", "summary")
+MEMORY_TOKEN_BUDGET = int(os.environ.get("MEMORY_TOKEN_BUDGET", 1000))
+
+# Older turns are folded into the summary by one background worker, so
+# summarization never sits between a question and its answer
+_summarizer = ThreadPoolExecutor(max_workers=1)
+
+
+def estimate_tokens(messages):
+    # ~4 characters per token; avoids loading a tokenizer for a budget check
+    return sum(len(m.content) for m in messages) // 4
+
+
+class BoundedSummaryMemory(BaseChatMemory):
+    """Recent turns verbatim within a token budget, older ones as a rolling summary."""
+
+    llm: BaseLanguageModel
+    memory_key: str = "chat_history"
+    return_messages: bool = True
+    max_token_limit: int = MEMORY_TOKEN_BUDGET
+    summary: str = ""
+
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _folding: bool = PrivateAttr(default=False)
+    _generation: int = PrivateAttr(default=0)  # bumped by clear()
+
+    @property
+    def memory_variables(self):
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs):
+        with self._lock:
+            messages = list(self.chat_memory.messages)
+            summary = self.summary
+        if summary:
+            messages = [SystemMessage(content=summary)] + messages
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: get_buffer_string(messages)}
+
+    def save_context(self, inputs, outputs):
+        with self._lock:
+            super().save_context(inputs, outputs)
+            if self._folding or estimate_tokens(self.chat_memory.messages) <= self.max_token_limit:
+                return
+            self._folding = True
+        _summarizer.submit(self._fold_old_turns)
+
+    def _fold_old_turns(self):
+        try:
+            with self._lock:
+                messages = list(self.chat_memory.messages)
+                summary = self.summary
+                generation = self._generation
+            # Oldest messages that must go for the rest to fit the budget
+            count = 0
+            while count < len(messages) and estimate_tokens(messages[count:]) > self.max_token_limit:
+                count += 1
+            if not count:
+                with self._lock:
+                    self._folding = False
+                return
+
+            new_lines = get_buffer_string(messages[:count])
+            new_summary = self.llm.invoke(SUMMARY_PROMPT.format(summary=summary, new_lines=new_lines))
+            new_summary = getattr(new_summary, "content", new_summary).strip()
+
+            # Only appends happen meanwhile, so the folded messages are still the first `count`
+            with self._lock:
+                if generation != self._generation:
+                    self._folding = False
+                    return  # cleared while summarizing
+                remaining = list(self.chat_memory.messages)[count:]
+                self.chat_memory.clear()
+                self.chat_memory.add_messages(remaining)
+                self.summary = new_summary
+        except Exception as e:
+            print(f"⚠️ Conversation summary failed: {e}")
+            with self._lock:
+                self._folding = False
+            return
+
+        # Turns saved while we were summarizing may have pushed it over again
+        with self._lock:
+            again = estimate_tokens(self.chat_memory.messages) > self.max_token_limit
+            self._folding = again
+        if again:
+            _summarizer.submit(self._fold_old_turns)
+
+    def clear(self):
+        with self._lock:
+            super().clear()
+            self.summary = ""
+            self._generation += 1
@@ -0,0 +1,68 @@
+# modules/embedding_cache.py
+import os
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from modules.cache_utils import DiskCache, content_hash
+
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", 32))
+EMBED_CACHE_MAX_BYTES = int(os.environ.get("EMBED_CACHE_MAX_BYTES", 1024 ** 3))
+
+_store = None
+
+
+def _get_store():
+    global _store
+    if _store is None:
+        _store = DiskCache("embeddings", max_bytes=EMBED_CACHE_MAX_BYTES)
+    return _store
+
+
+class CachedEmbeddings(Embeddings):
+    """Wrap an embedding backend with a per-chunk float32 cache.
+
+    Vectors are keyed by (model name, chunk text), so unchanged chunks of a
+    revised document are never re-embedded. Identical chunks inside one call
+    are embedded once, and misses go to the backend in `batch_size` groups.
+    """
+
+    def __init__(self, backend, model_name, batch_size=EMBED_BATCH_SIZE):
+        self.backend = backend
+        self.model_name = model_name
+        self.batch_size = batch_size
+
+    def _key(self, text):
+        return content_hash(self.model_name, text)
+
+    def embed_documents(self, texts):
+        keys = [self._key(t) for t in texts]
+        cached = _get_store().get_many(keys)
+        vectors = {k: np.frombuffer(v, dtype=np.float32) for k, v in cached.items()}
+
+        # Unique texts that still need an embedding, in first-seen order
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+
+        pending = list(missing.items())
+        for i in range(0, len(pending), self.batch_size):
+            batch = pending[i:i + self.batch_size]
+            embedded = self.backend.embed_documents([text for _, text in batch])
+            fresh = {}
+            for (key, _), vec in zip(batch, embedded):
+                vec = np.asarray(vec, dtype=np.float32)
+                vectors[key] = vec
+                fresh[key] = vec.tobytes()
+            _get_store().set_many(fresh)
+
+        return [vectors[k].tolist() for k in keys]
+
+    def embed_query(self, text):
+        key = self._key("query:" + text)
+        cached = _get_store().get(key)
+        if cached is not None:
+            return np.frombuffer(cached, dtype=np.float32).tolist()
+        vec = np.asarray(self.backend.embed_query(text), dtype=np.float32)
+        _get_store().set(key, vec.tobytes())
+        return vec.tolist()
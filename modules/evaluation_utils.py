@@ -1,26 +1,25 @@
 import os
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-from bert_score import score as bert_score
+import time
+import random
+import threading
+import numpy as np
 import cohere
-import evaluate  # BLEU and ROUGE
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.model_registry import get_sentence_transformer, get_metric, get_bert_scorer
+from modules.question_sampler import PASSAGE_CHARS, generate_across_document
 
 # Cohere setup
 COHERE_API_KEY = os.environ.get("COHERE_API_KEY")
 co = cohere.Client(COHERE_API_KEY) if COHERE_API_KEY else None
 
-# Load embedding model
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
-
-# Load BLEU and ROUGE metrics
-bleu_metric = evaluate.load("bleu")
-rouge_metric = evaluate.load("rouge")
+# Concurrency and retry settings for answer generation and LLM judging
+EVAL_CONCURRENCY = int(os.environ.get("EVAL_CONCURRENCY", 4))
+JUDGE_MAX_RETRIES = int(os.environ.get("JUDGE_MAX_RETRIES", 5))
+JUDGE_BACKOFF_SECONDS = float(os.environ.get("JUDGE_BACKOFF_SECONDS", 1.0))
 
 # ---------------- Question Generator using Cohere ----------------
-def generate_eval_questions(text, num_questions=5):
-    if not co:
-        raise RuntimeError("❌ Cohere API key not configured.")
-
+def _generate_from_passage(text, num_questions):
     prompt = f"""
 You are a helpful teacher.
 
@@ -29,7 +28,7 @@ Generate {num_questions} important and content-specific question-answer pairs fr
 Only ask questions based strictly on the content. Avoid general knowledge.
 
 TEXT:
-{text[:3000]}
+{text[:PASSAGE_CHARS]}
 
 FORMAT:
 Q1: <question>
@@ -62,40 +61,71 @@ Only return the list of Qn/An pairs in the format above. No explanation.
 
     return questions[:num_questions]
 
+
+def generate_eval_questions(text, num_questions=5, vectorstore=None):
+    if not co:
+        raise RuntimeError("❌ Cohere API key not configured.")
+
+    questions = generate_across_document(text, num_questions, _generate_from_passage, vectorstore)
+    if not questions:
+        raise RuntimeError("❌ Cohere generation returned no questions.")
+    return questions
+
 # ---------------- Evaluation Core ----------------
-def evaluate_responses(eval_questions, chat_chain):
-    results = []
+def _stateless(chat_chain):
+    # Evaluation questions must not read or write the user's chat memory, and
+    # a shared memory object is not safe to use from several threads
+    if getattr(chat_chain, "memory", None) is None:
+        return chat_chain
+    copy = getattr(chat_chain, "model_copy", None) or chat_chain.copy
+    return copy(update={"memory": None})
+
+
+def generate_answers(eval_questions, chat_chain, concurrency=EVAL_CONCURRENCY, progress=None):
+    chain = _stateless(chat_chain)
+    answered = [0]
+    answered_lock = threading.Lock()
+
+    def answer(q):
+        result = chain.invoke({"question": q["question"], "chat_history": []})["answer"]
+        if progress:
+            with answered_lock:
+                answered[0] += 1
+                done = answered[0]
+            progress(done, len(eval_questions), f"Answered question {done}/{len(eval_questions)}")
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        try:
+            return list(pool.map(answer, eval_questions))
+        except BaseException:
+            pool.shutdown(cancel_futures=True)  # e.g. job cancelled: skip questions not started
+            raise
+
+
+def _is_rate_limited(error):
+    status = getattr(error, "status_code", None) or getattr(error, "http_status", None)
+    return status == 429 or "429" in str(error) or "rate limit" in str(error).lower()
 
-    for q in eval_questions:
-        question = q["question"]
-        expected = q["expected_answer"]
-        bot_answer = chat_chain.run(question)
-
-        # Cosine similarity
-        embeddings = embedder.encode([expected, bot_answer])
-        cosine_score = cosine_similarity([embeddings[0]], [embeddings[1]])[0][0]
-
-        # BERTScore
-        _, _, bertF1 = bert_score([bot_answer], [expected], lang="en", verbose=False)
-        bert_score_val = float(bertF1[0])
-
-        # BLEU score
-        bleu_score_val = bleu_metric.compute(
-            predictions=[bot_answer],
-            references=[[expected]]
-        )["bleu"]
-
-        # ROUGE-L score
-        rouge_score_val = rouge_metric.compute(
-            predictions=[bot_answer],
-            references=[expected]
-        )["rougeL"]
-
-        # Cohere LLM score
-        llm_score = None
-        if co:
-            try:
-                eval_prompt = f"""
+
+def _with_backoff(call):
+    # Exponential backoff with jitter on rate limits; other errors surface at once
+    for attempt in range(JUDGE_MAX_RETRIES + 1):
+        try:
+            return call()
+        except Exception as e:
+            if attempt == JUDGE_MAX_RETRIES or not _is_rate_limited(e):
+                raise
+            time.sleep(JUDGE_BACKOFF_SECONDS * (2 ** attempt) * (0.5 + random.random()))
+
+
+def llm_judge_score(question, expected, bot_answer, judge=None):
+    # Cohere LLM score
+    judge = judge or co
+    if not judge:
+        return None
+    try:
+        eval_prompt = f"""
 You are an expert evaluator.
 
 Compare the expected answer and the student's answer for this question. Return a score between 0 (worst) and 1 (perfect) based strictly on relevance, correctness, and completeness.
@@ -112,27 +142,80 @@ ANSWER:
 Respond only with:
 Score: <value between 0 and 1>
 """
-                response = co.generate(
-                    model="command-r-plus",
-                    prompt=eval_prompt,
-                    max_tokens=10,
-                    temperature=0.2,
-                )
-                output = response.generations[0].text.strip()
-                if "Score:" in output:
-                    llm_score = float(output.split("Score:")[1].strip())
-            except Exception as e:
-                print("⚠️ Cohere LLM scoring failed:", e)
+        response = _with_backoff(lambda: judge.generate(
+            model="command-r-plus",
+            prompt=eval_prompt,
+            max_tokens=10,
+            temperature=0.2,
+        ))
+        output = response.generations[0].text.strip()
+        if "Score:" in output:
+            return float(output.split("Score:")[1].strip())
+    except Exception as e:
+        print("⚠️ Cohere LLM scoring failed:", e)
+    return None
+
+
+def score_responses(eval_questions, bot_answers, concurrency=EVAL_CONCURRENCY, judge=None):
+    """Score all collected answers with one batched call per metric."""
+    if not eval_questions:
+        return []
+    questions = [q["question"] for q in eval_questions]
+    expected = [q["expected_answer"] for q in eval_questions]
+    n = len(expected)
+
+    # Judge calls are network-bound: run them while the local metrics compute
+    judge_pool = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    llm_futures = [
+        judge_pool.submit(llm_judge_score, question, ref, answer, judge)
+        for question, ref, answer in zip(questions, expected, bot_answers)
+    ]
+    judge_pool.shutdown(wait=False)
+
+    # Cosine similarity: one encode over expected + answers, row-wise dot of unit vectors
+    embeddings = get_sentence_transformer().encode(expected + bot_answers, normalize_embeddings=True)
+    cosine_scores = np.sum(embeddings[:n] * embeddings[n:], axis=1)
+
+    # BERTScore with a scorer that stays loaded between runs
+    _, _, bertF1 = get_bert_scorer().score(bot_answers, expected, verbose=False)
+    bert_scores = bertF1.tolist()
+
+    # ROUGE-L: one call, per-pair scores
+    rouge_scores = get_metric("rouge").compute(
+        predictions=bot_answers,
+        references=expected,
+        use_aggregator=False
+    )["rougeL"]
+
+    # BLEU: the metric only reports corpus-level BLEU, so score each pair
+    # against the already-loaded metric (pure Python, no model work)
+    bleu_metric = get_metric("bleu")
+    bleu_scores = [
+        bleu_metric.compute(predictions=[answer], references=[[ref]])["bleu"]
+        for answer, ref in zip(bot_answers, expected)
+    ]
+
+    llm_scores = [f.result() for f in llm_futures]
 
+    results = []
+    for i in range(n):
         results.append({
-            "question": question,
-            "expected_answer": expected,
-            "bot_response": bot_answer,
-            "cosine_score": round(cosine_score, 3),
-            "bert_score": round(bert_score_val, 3),
-            "bleu_score": round(bleu_score_val, 3),
-            "rougeL_score": round(rouge_score_val, 3),
-            "llm_score": round(llm_score, 3) if llm_score is not None else None,
+            "question": questions[i],
+            "expected_answer": expected[i],
+            "bot_response": bot_answers[i],
+            "cosine_score": round(float(cosine_scores[i]), 3),
+            "bert_score": round(bert_scores[i], 3),
+            "bleu_score": round(bleu_scores[i], 3),
+            "rougeL_score": round(rouge_scores[i], 3),
+            "llm_score": round(llm_scores[i], 3) if llm_scores[i] is not None else None,
         })
 
     return results
+
+
+def evaluate_responses(eval_questions, chat_chain, concurrency=EVAL_CONCURRENCY, judge=None, progress=None):
+    # Collect every answer first, then score the whole set in one pass per metric
+    bot_answers = generate_answers(eval_questions, chat_chain, concurrency, progress)
+    if progress:
+        progress(len(eval_questions), len(eval_questions), "Scoring answers")
+    return score_responses(eval_questions, bot_answers, concurrency, judge)
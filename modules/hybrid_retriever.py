@@ -0,0 +1,132 @@
+# modules/hybrid_retriever.py
+import re
+import json
+import math
+from collections import Counter
+import numpy as np
+from langchain_core.retrievers import BaseRetriever
+
+# Identifiers like "AB-1234", "v2.1" or "part_no/7" are kept whole, and also
+# indexed by their parts and joined ("ab", "1234", "ab1234")
+_TOKEN = re.compile(r"\w+(?:[-./]\w+)*")
+_TOKEN_SEPARATOR = re.compile(r"[-./]")
+TOKENIZER_VERSION = 2  # bump when tokenize changes: persisted indexes are rebuilt
+
+
+def tokenize(text):
+    terms = []
+    for token in _TOKEN.findall(text.lower()):
+        terms.append(token)
+        parts = _TOKEN_SEPARATOR.split(token)
+        if len(parts) > 1:
+            terms.extend(parts)
+            terms.append("".join(parts))
+    return terms
+
+
+class BM25Index:
+    """Inverted index with BM25 scoring, keyed by vectorstore chunk id."""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # term -> {chunk_id: term frequency}
+        self.lengths = {}   # chunk_id -> token count
+        self.total_length = 0
+
+    def add(self, chunk_id, text):
+        if chunk_id in self.lengths:
+            self.remove(chunk_id)
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[chunk_id] = tf
+        length = sum(counts.values())
+        self.lengths[chunk_id] = length
+        self.total_length += length
+
+    def remove(self, chunk_id, text=None):
+        # With the chunk text only its own terms are visited, not the whole vocabulary
+        if chunk_id not in self.lengths:
+            return
+        self.total_length -= self.lengths.pop(chunk_id)
+        for term in set(tokenize(text)) if text is not None else list(self.postings):
+            if term not in self.postings:
+                continue
+            docs = self.postings[term]
+            if docs.pop(chunk_id, None) is not None and not docs:
+                del self.postings[term]
+
+    def search(self, query, k=4):
+        n = len(self.lengths)
+        if not n:
+            return []
+        avg_length = self.total_length / n
+        scores = Counter()
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for chunk_id, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / avg_length)
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores.most_common(k)
+
+    def to_bytes(self):
+        return json.dumps({
+            "tokenizer": TOKENIZER_VERSION, "k1": self.k1, "b": self.b,
+            "postings": self.postings, "lengths": self.lengths,
+        }).encode("utf-8")
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Index saved by `to_bytes`; None if it was built with another tokenizer."""
+        raw = json.loads(data.decode("utf-8"))
+        if raw.get("tokenizer") != TOKENIZER_VERSION:
+            return None
+        index = cls(raw["k1"], raw["b"])
+        index.postings = raw["postings"]
+        index.lengths = raw["lengths"]
+        index.total_length = sum(index.lengths.values())
+        return index
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore):
+        index = cls()
+        for chunk_id in vectorstore.index_to_docstore_id.values():
+            index.add(chunk_id, vectorstore.docstore.search(chunk_id).page_content)
+        return index
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuse FAISS similarity and BM25 rankings with reciprocal rank fusion."""
+
+    vectorstore: object
+    bm25: object
+    k: int = 4
+    fetch_k: int = 20
+    sparse_weight: float = 0.5
+    rrf_k: int = 60
+
+    def _dense_ids(self, query):
+        # Docstore ids (also the BM25 keys) straight from the index positions;
+        # Document.id is only filled in by some langchain_community versions
+        index = self.vectorstore.index
+        if not index.ntotal:
+            return []
+        vector = np.asarray([self.vectorstore.embedding_function.embed_query(query)], dtype=np.float32)
+        _, positions = index.search(vector, min(self.fetch_k, index.ntotal))
+        mapping = self.vectorstore.index_to_docstore_id
+        return [mapping[int(i)] for i in positions[0] if int(i) in mapping]
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        dense_ids = self._dense_ids(query)
+        sparse_ids = [chunk_id for chunk_id, _ in self.bm25.search(query, self.fetch_k)]
+
+        fused = Counter()
+        for rank, chunk_id in enumerate(dense_ids):
+            fused[chunk_id] += (1 - self.sparse_weight) / (self.rrf_k + rank + 1)
+        for rank, chunk_id in enumerate(sparse_ids):
+            fused[chunk_id] += self.sparse_weight / (self.rrf_k + rank + 1)
+
+        return [self.vectorstore.docstore.search(chunk_id) for chunk_id, _ in fused.most_common(self.k)]
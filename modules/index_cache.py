@@ -0,0 +1,62 @@
+# modules/index_cache.py
+import os
+import shutil
+import tempfile
+from langchain_community.vectorstores import FAISS
+
+from modules.cache_utils import cache_path, path_lock, touch, evict_lru
+
+# Bounds for the saved FAISS indexes (shared by every Streamlit session)
+INDEX_CACHE_MAX_BYTES = int(os.environ.get("INDEX_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+INDEX_CACHE_MAX_ENTRIES = int(os.environ.get("INDEX_CACHE_MAX_ENTRIES", 50))
+
+
+def _index_dir():
+    return cache_path("faiss")
+
+
+def load_index(key, embeddings):
+    """Return the saved vectorstore for `key`, or None on a miss."""
+    path = os.path.join(_index_dir(), key)
+    if not os.path.isdir(path):
+        return None
+    try:
+        vectorstore = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+    except Exception as e:
+        # Half-evicted or corrupt entry: drop it and rebuild
+        print(f"⚠️ Discarding unreadable index {key}: {e}")
+        shutil.rmtree(path, ignore_errors=True)
+        return None
+    touch(path)
+    return vectorstore
+
+
+def read_index_file(key, name):
+    """Bytes of a side file stored with the index for `key` (e.g. the BM25 index)."""
+    try:
+        with open(os.path.join(_index_dir(), key, name), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def save_index(key, vectorstore, extra_files=None):
+    directory = _index_dir()
+    path = os.path.join(directory, key)
+    # Write into a private temp dir and rename it into place, so concurrent
+    # sessions and processes never observe a partially written index.
+    tmp = tempfile.mkdtemp(prefix=".tmp-", dir=directory)
+    try:
+        vectorstore.save_local(tmp)
+        for name, data in (extra_files or {}).items():
+            with open(os.path.join(tmp, name), "wb") as f:
+                f.write(data)
+        with path_lock(directory):
+            try:
+                os.rename(tmp, path)
+            except OSError:
+                touch(path)  # another process already stored the same content
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    evict_lru(directory, INDEX_CACHE_MAX_BYTES, INDEX_CACHE_MAX_ENTRIES, keep=(key,))
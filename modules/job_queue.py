@@ -0,0 +1,192 @@
+# modules/job_queue.py
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from modules.cache_utils import cache_path
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_RETENTION_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", 7 * 24 * 3600))
+# Results JSON can't hold wait in memory until collected; abandoned ones are dropped past this
+MAX_RESULTS_IN_MEMORY = 8
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+ACTIVE = (QUEUED, RUNNING)
+
+# Shared by every session, so concurrent users queue instead of all running at once
+_pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+_results = OrderedDict()  # job id -> uncollected return value that JSON can't hold
+_cancelled = set()
+_lock = threading.Lock()
+_db_path = None  # set once the schema exists and interrupted jobs are recovered
+
+
+class JobCancelled(Exception):
+    """Raised from a job's progress callback once the job has been cancelled."""
+
+
+def _init_db():
+    path = os.path.join(cache_path("jobs"), "jobs.db")
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, key TEXT, status TEXT NOT NULL, "
+                "done INTEGER NOT NULL DEFAULT 0, total INTEGER NOT NULL DEFAULT 0, message TEXT, "
+                "error TEXT, result TEXT, created REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_kind_key ON jobs (kind, key)")
+            # Workers died with the previous process: nothing queued or running survives it
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = 'Interrupted by a restart', updated = ? "
+                "WHERE status IN (?, ?)",
+                (FAILED, time.time(), *ACTIVE),
+            )
+            conn.execute("DELETE FROM jobs WHERE updated < ?", (time.time() - JOB_RETENTION_SECONDS,))
+    finally:
+        conn.close()
+    return path
+
+
+def _connect():
+    global _db_path
+    if _db_path is None:
+        with _lock:
+            if _db_path is None:
+                _db_path = _init_db()
+    conn = sqlite3.connect(_db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _update(job_id, **fields):
+    fields["updated"] = time.time()
+    columns = ", ".join(f"{name} = ?" for name in fields)
+    with _connect() as conn:
+        conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+
+def get_job(job_id):
+    """Status row for a job: kind, status, done/total, message, error; None if unknown."""
+    if not job_id:
+        return None
+    with _connect() as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def job_result(job_id):
+    """Return value of a finished job (None until then or once it has been dropped).
+
+    Results JSON can't hold (indexes, chains) are handed over once: the first
+    call takes them out of memory.
+    """
+    with _lock:
+        if job_id in _results:
+            return _results.pop(job_id)
+    job = get_job(job_id)
+    if job and job["result"] is not None:
+        return json.loads(job["result"])
+    return None
+
+
+def find_job(kind, key):
+    """Queued or running job for `key`, if any.
+
+    Finished jobs are not reused: their results may be partial or stale, and
+    the work itself caches what is safe to reuse.
+    """
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT id FROM jobs WHERE kind = ? AND key = ? AND status IN (?, ?) ORDER BY created DESC",
+            (kind, key, *ACTIVE),
+        ).fetchone()
+    return row["id"] if row else None
+
+
+def cancel_job(job_id):
+    with _lock:
+        _cancelled.add(job_id)
+    with _connect() as conn:
+        # Not started yet: cancel right away; running jobs stop at their next progress report
+        conn.execute(
+            "UPDATE jobs SET status = ?, updated = ? WHERE id = ? AND status = ?",
+            (CANCELLED, time.time(), job_id, QUEUED),
+        )
+
+
+def _run(job_id, fn, args, kwargs):
+    def progress(done, total, message=""):
+        if job_id in _cancelled:
+            raise JobCancelled()
+        _update(job_id, done=done, total=total, message=message)
+
+    if job_id in _cancelled:
+        with _lock:
+            _cancelled.discard(job_id)
+        return
+    _update(job_id, status=RUNNING)
+    try:
+        result = fn(*args, progress=progress, **kwargs)
+    except JobCancelled:
+        _update(job_id, status=CANCELLED, message="Cancelled")
+        return
+    except Exception as e:
+        print(f"⚠️ Job {job_id} failed: {e}")
+        _update(job_id, status=FAILED, error=str(e))
+        return
+    finally:
+        with _lock:
+            _cancelled.discard(job_id)
+
+    try:
+        stored = json.dumps(result)  # persisted, so it outlives this process
+    except (TypeError, ValueError):
+        stored = None
+        with _lock:
+            _results[job_id] = result
+            while len(_results) > MAX_RESULTS_IN_MEMORY:
+                _results.popitem(last=False)
+    _update(job_id, status=DONE, result=stored)
+
+
+def submit_job(kind, fn, *args, key=None, **kwargs):
+    """Run `fn(*args, progress=..., **kwargs)` on the worker pool and return its job id.
+
+    `progress(done, total, message)` records progress and raises JobCancelled
+    once the job is cancelled. With a `key`, a job already queued or running
+    for the same key is returned instead of starting the work twice.
+    """
+    if key is not None:
+        existing = find_job(kind, key)
+        if existing:
+            return existing
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with _connect() as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, kind, key, status, message, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, key, QUEUED, "Waiting for a worker...", now, now),
+        )
+    _pool.submit(_run, job_id, fn, args, kwargs)
+    return job_id
+
+
+def show_job_progress(job_id, label):
+    """Progress bar with a cancel button for an active job; returns the job row."""
+    job = get_job(job_id)
+    if job and job["status"] in ACTIVE:
+        fraction = job["done"] / job["total"] if job["total"] else 0.0
+        st.progress(min(fraction, 1.0), text=f"{label}: {job['message'] or job['status']}")
+        if st.button("✖️ Cancel", key=f"cancel_{job_id}"):
+            cancel_job(job_id)
+    return job
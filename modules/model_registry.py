@@ -0,0 +1,87 @@
+# modules/model_registry.py
+import os
+import time
+import threading
+
+# Models idle for longer than this are dropped on the next registry access (0 = never)
+MODEL_IDLE_SECONDS = int(os.environ.get("MODEL_IDLE_SECONDS", 0))
+
+# Process-wide registry: every page and every Streamlit session shares these
+_models = {}  # name -> {"model", "bytes", "loaded_at", "last_used"}
+_lock = threading.Lock()
+_load_locks = {}
+
+
+def _estimate_bytes(model):
+    # torch modules report their parameter/buffer sizes; anything else is unknown (0)
+    model = getattr(model, "_model", model)  # e.g. BERTScorer wraps its torch model
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except Exception:
+        return 0
+
+
+def get_model(name, loader):
+    """Return the model registered as `name`, calling `loader()` on first use only."""
+    with _lock:
+        entry = _models.get(name)
+        if entry is None:
+            load_lock = _load_locks.setdefault(name, threading.Lock())
+    if entry is None:
+        # Per-model lock: concurrent first requests load once, other models aren't blocked
+        with load_lock:
+            with _lock:
+                entry = _models.get(name)
+            if entry is None:
+                model = loader()
+                now = time.time()
+                entry = {"model": model, "bytes": _estimate_bytes(model), "loaded_at": now, "last_used": now}
+                with _lock:
+                    _models[name] = entry
+    entry["last_used"] = time.time()
+    if MODEL_IDLE_SECONDS:
+        unload_idle(MODEL_IDLE_SECONDS)
+    return entry["model"]
+
+
+def get_sentence_transformer(model_name="all-MiniLM-L6-v2"):
+    def load():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    return get_model(f"sentence-transformer:{model_name}", load)
+
+
+def get_metric(metric_name):
+    def load():
+        import evaluate  # BLEU and ROUGE
+        return evaluate.load(metric_name)
+    return get_model(f"metric:{metric_name}", load)
+
+
+def get_bert_scorer(lang="en"):
+    def load():
+        from bert_score import BERTScorer
+        return BERTScorer(lang=lang)
+    return get_model(f"bert-scorer:{lang}", load)
+
+
+def memory_usage():
+    """Approximate resident bytes per loaded model."""
+    with _lock:
+        return {name: entry["bytes"] for name, entry in _models.items()}
+
+
+def unload(name):
+    with _lock:
+        return _models.pop(name, None) is not None
+
+
+def unload_idle(max_idle_seconds=1800):
+    """Drop models unused for `max_idle_seconds`; they reload on next use."""
+    cutoff = time.time() - max_idle_seconds
+    with _lock:
+        idle = [name for name, entry in _models.items() if entry["last_used"] < cutoff]
+        for name in idle:
+            del _models[name]
+    return idle
@@ -0,0 +1,209 @@
+# modules/ollama_client.py
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+# Same variable the ollama CLI reads; a stub server can be pointed at the same way
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")  # how long the server keeps a model loaded
+OLLAMA_CONNECT_TIMEOUT = float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", 3))
+OLLAMA_READ_TIMEOUT = float(os.environ.get("OLLAMA_READ_TIMEOUT", 300))
+OLLAMA_POOL_SIZE = int(os.environ.get("OLLAMA_POOL_SIZE", 8))
+OLLAMA_HEALTH_TTL = float(os.environ.get("OLLAMA_HEALTH_TTL", 30))
+
+_warmer = ThreadPoolExecutor(max_workers=1)
+
+
+def _base_url(host):
+    host = host.rstrip("/")
+    return host if "://" in host else f"http://{host}"
+
+
+class OllamaClient:
+    """One keep-alive HTTP session to the Ollama server, shared by every caller.
+
+    Replaces a fresh `ollama` process (and TCP connection) per request with
+    pooled connections; the server keeps models loaded for `keep_alive`.
+    """
+
+    def __init__(self, host=OLLAMA_HOST, keep_alive=OLLAMA_KEEP_ALIVE,
+                 timeout=(OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT),
+                 pool_size=OLLAMA_POOL_SIZE, health_ttl=OLLAMA_HEALTH_TTL):
+        self.base_url = _base_url(host)
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.health_ttl = health_ttl
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._health = (0.0, False, [])  # (checked at, available, model names)
+        self._health_lock = threading.Lock()
+        self._warm = set()
+
+    def _post(self, path, payload, stream=False):
+        response = self.session.post(
+            self.base_url + path, json=payload, stream=stream, timeout=self.timeout
+        )
+        if response.status_code >= 400:
+            try:
+                message = response.json().get("error", response.text)
+            except ValueError:
+                message = response.text
+            response.close()
+            raise RuntimeError(f"❌ Ollama {path} failed ({response.status_code}): {message}")
+        return response
+
+    # --- Health ---
+    def _check(self):
+        try:
+            response = self.session.get(
+                self.base_url + "/api/tags", timeout=(OLLAMA_CONNECT_TIMEOUT, OLLAMA_CONNECT_TIMEOUT)
+            )
+            response.raise_for_status()
+            return True, [m["name"] for m in response.json().get("models", [])]
+        except Exception:
+            return False, []
+
+    def is_available(self, force=False):
+        """Whether the server answers; the result is reused for `health_ttl` seconds."""
+        with self._health_lock:
+            checked, available, models = self._health
+            if force or time.time() - checked > self.health_ttl:
+                available, models = self._check()
+                self._health = (time.time(), available, models)
+            return available
+
+    def models(self):
+        self.is_available()
+        return list(self._health[2])
+
+    # --- Generation ---
+    def generate(self, prompt, model, options=None):
+        payload = {"model": model, "prompt": prompt, "stream": False, "keep_alive": self.keep_alive}
+        if options:
+            payload["options"] = options
+        return self._post("/api/generate", payload).json()["response"]
+
+    def stream(self, prompt, model, options=None):
+        """Yield response text as the model produces it; closing the generator stops generation."""
+        payload = {"model": model, "prompt": prompt, "stream": True, "keep_alive": self.keep_alive}
+        if options:
+            payload["options"] = options
+        with self._post("/api/generate", payload, stream=True) as response:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                part = json.loads(line)
+                if "error" in part:
+                    raise RuntimeError(f"❌ Ollama generation failed: {part['error']}")
+                if part.get("response"):
+                    yield part["response"]
+                if part.get("done"):
+                    return
+
+    def stream_lines(self, prompt, model, options=None):
+        """Like `stream`, regrouped into complete lines."""
+        buffer = ""
+        for token in self.stream(prompt, model, options):
+            buffer += token
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                yield line + "\n"
+        if buffer:
+            yield buffer
+
+    def embed(self, text, model):
+        return self._post(
+            "/api/embeddings", {"model": model, "prompt": text, "keep_alive": self.keep_alive}
+        ).json()["embedding"]
+
+    # --- Model residency ---
+    def warm_up(self, model, wait=False):
+        """Load `model` on the server ahead of the first real request (once per model)."""
+        if model in self._warm:
+            return None
+        self._warm.add(model)
+
+        def load():
+            try:
+                # An empty prompt only loads the model and applies keep_alive
+                self._post("/api/generate", {"model": model, "prompt": "", "keep_alive": self.keep_alive}).close()
+            except Exception as e:
+                self._warm.discard(model)
+                print(f"⚠️ Ollama warm-up of {model} failed: {e}")
+
+        future = _warmer.submit(load)
+        return future.result() if wait else future
+
+    def unload(self, model):
+        self._warm.discard(model)
+        self._post("/api/generate", {"model": model, "prompt": "", "keep_alive": 0}).close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OllamaClient()
+        return _client
+
+
+# --- LangChain adapters ---
+class PooledOllama(LLM):
+    """LangChain LLM over the shared client; streams tokens to callbacks like `Ollama` does."""
+
+    model: str
+    options: Optional[dict] = None
+
+    @property
+    def _llm_type(self):
+        return "pooled-ollama"
+
+    @property
+    def _identifying_params(self):
+        return {"model": self.model, "options": self.options}
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[GenerationChunk]:
+        options = dict(self.options or {})
+        if stop:
+            options["stop"] = stop
+        for token in get_client().stream(prompt, self.model, options):
+            if run_manager:
+                run_manager.on_llm_new_token(token)
+            yield GenerationChunk(text=token)
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None,
+              run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> str:
+        return "".join(chunk.text for chunk in self._stream(prompt, stop, run_manager, **kwargs))
+
+
+class PooledOllamaEmbeddings(Embeddings):
+    """Same vectors as langchain's OllamaEmbeddings, over pooled connections."""
+
+    def __init__(self, model, embed_instruction="passage: ", query_instruction="query: "):
+        self.model = model
+        self.embed_instruction = embed_instruction
+        self.query_instruction = query_instruction
+
+    def embed_documents(self, texts):
+        client = get_client()
+        return [client.embed(self.embed_instruction + text, self.model) for text in texts]
+
+    def embed_query(self, text):
+        return get_client().embed(self.query_instruction + text, self.model)
@@ -0,0 +1,96 @@
+# modules/ollama_stub.py
+# Minimal stand-in for the Ollama HTTP API, for exercising the client offline:
+#
+#   python -m modules.ollama_stub --port 11500
+#   OLLAMA_HOST=http://127.0.0.1:11500 streamlit run app.py
+import json
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_MODELS = ["gemma3:1b", "phi:latest", "nomic-embed-text:latest"]
+STUB_EMBED_DIM = 32
+
+
+def stub_reply(prompt):
+    """Deterministic Q/A-formatted text, so question parsing works against the stub."""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    return "\n".join(
+        f"Q{i}: Stub question {digest}-{i}?\nA{i}: Stub answer {digest}-{i}." for i in range(1, 6)
+    )
+
+
+def stub_embedding(text):
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [(digest[i % len(digest)] - 128) / 128 for i in range(STUB_EMBED_DIM)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real server
+    requests_seen = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        type(self).requests_seen += 1
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": name} for name in STUB_MODELS]})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        type(self).requests_seen += 1
+        payload = self._read_json()
+        if self.path == "/api/embeddings":
+            self._send_json({"embedding": stub_embedding(payload.get("prompt", ""))})
+        elif self.path == "/api/generate":
+            reply = stub_reply(payload["prompt"]) if payload.get("prompt") else ""
+            if not payload.get("stream", True):
+                self._send_json({"model": payload["model"], "response": reply, "done": True})
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            parts = [word + " " for word in reply.split(" ")] + [None]
+            for part in parts:
+                line = {"model": payload["model"], "response": part or "", "done": part is None}
+                data = (json.dumps(line) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+
+def start_stub_server(port=0):
+    """Serve the stub on 127.0.0.1 in a daemon thread; returns (server, base URL)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Ollama server")
+    parser.add_argument("--port", type=int, default=11500)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), StubHandler)
+    print(f"Stub Ollama listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,225 @@
+import os
 import PyPDF2
 from pdf2image import convert_from_bytes
 import pytesseract
 from PIL import Image
 import io
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from modules.cache_utils import content_hash, file_bytes
+
+# Page extraction runs in a process pool once a batch is large enough to pay for it
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", os.cpu_count() or 1))
+PAGES_PER_TASK = 25
+PARALLEL_MIN_PAGES = 40
+
+# Scanned pages are rasterized and OCR'd one at a time; pdftoppm and tesseract
+# run as subprocesses, so a small thread pool gives real parallelism
+OCR_DPI = int(os.environ.get("OCR_DPI", 200))
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+
+# Parsed documents kept per process, keyed by content hash
+DOCUMENT_CACHE_SIZE = int(os.environ.get("DOCUMENT_CACHE_SIZE", 32))
+
+_pool = None
+_ocr_pool = None
+_documents = OrderedDict()
+_documents_lock = threading.Lock()
+_worker_reader = (None, None)  # (path, PdfReader) last opened by this worker process
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+    return _pool
+
+
+def _get_ocr_pool():
+    global _ocr_pool
+    if _ocr_pool is None:
+        _ocr_pool = ThreadPoolExecutor(max_workers=OCR_WORKERS)
+    return _ocr_pool
+
+
+def _ocr_page(data, page_number):
+    # Only this page's image is ever held in memory
+    images = convert_from_bytes(data, dpi=OCR_DPI, first_page=page_number, last_page=page_number)
+    return pytesseract.image_to_string(images[0]) if images else ""
 
-def extract_text_from_pdfs(pdf_files):
-    full_text = ""
 
-    for file in pdf_files:
+def _extract_page_range(source, start, stop):
+    """Extract a contiguous page range from PDF bytes or, in a worker process, a file path."""
+    global _worker_reader
+    if isinstance(source, str):
+        # Workers get a path, not the bytes, and reuse the reader across that file's ranges
+        if _worker_reader[0] != source:
+            _worker_reader = (source, PyPDF2.PdfReader(source))
+        reader = _worker_reader[1]
+    else:
+        reader = PyPDF2.PdfReader(io.BytesIO(source))
+    return [reader.pages[n].extract_text() or "" for n in range(start, stop)]
+
+
+def _spill(data):
+    # One copy on disk per file instead of one pickled copy per page range; the
+    # content hash in the name keeps a worker's cached reader from going stale
+    fd, path = tempfile.mkstemp(prefix=content_hash(data)[:16] + "-", suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    return path
+
+
+def _extract_file_pages(items):
+    """Extract the pages of each (name, data) item; None marks an unreadable file."""
+    jobs = []  # (name, data, page_count) or None
+    for name, data in items:
         try:
-            # Try reading with PyPDF2
-            reader = PyPDF2.PdfReader(file)
-            text_found = False
-            temp_text = ""
-
-            for page in reader.pages:
-                text = page.extract_text()
-                if text and text.strip():
-                    temp_text += text + "\n"
-                    text_found = True
-
-            if text_found:
-                full_text += temp_text
+            jobs.append((name, data, len(PyPDF2.PdfReader(io.BytesIO(data)).pages)))
+        except Exception as e:
+            print(f"⚠️ Error reading {name}: {e}")
+            jobs.append(None)
+
+    parallel = PDF_WORKERS > 1 and sum(job[2] for job in jobs if job) >= PARALLEL_MIN_PAGES
+
+    # Submit every page range of every file up front, collect in order
+    tasks = []
+    spilled = []
+    for job in jobs:
+        if job is None:
+            tasks.append(None)
+            continue
+        name, data, page_count = job
+        if parallel:
+            spilled.append(_spill(data))
+        ranges = []
+        for start in range(0, page_count, PAGES_PER_TASK):
+            stop = min(start + PAGES_PER_TASK, page_count)
+            if parallel:
+                ranges.append(_get_pool().submit(_extract_page_range, spilled[-1], start, stop))
             else:
-                # OCR fallback
-                file.seek(0)  # Ensure read pointer is reset
-                images = convert_from_bytes(file.read())
-                for img in images:
-                    ocr_text = pytesseract.image_to_string(img)
-                    full_text += ocr_text + "\n"
+                ranges.append((data, start, stop))
+        tasks.append((name, data, ranges))
+
+    results = []
+    ocr_jobs = []  # (file texts, page index, future)
+    for task in tasks:
+        if task is None:
+            results.append(None)
+            continue
+        name, data, ranges = task
+        try:
+            texts = []
+            for r in ranges:
+                texts.extend(r.result() if parallel else _extract_page_range(*r))
+
+            for n, text in enumerate(texts):
+                if not text.strip():
+                    # OCR fallback for pages without a text layer
+                    ocr_jobs.append((name, texts, n, _get_ocr_pool().submit(_ocr_page, data, n + 1)))
+            results.append(texts)
 
         except Exception as e:
-            print(f"⚠️ Error reading {file.name}: {e}")
+            print(f"⚠️ Error reading {name}: {e}")
+            results.append(None)
+
+    for path in spilled:
+        os.remove(path)
+
+    for name, texts, n, future in ocr_jobs:
+        try:
+            texts[n] = future.result()
+        except Exception as e:
+            print(f"⚠️ OCR failed for {name} page {n + 1}: {e}")
+
+    return results
+
+
+# -----------------------------
+# Shared Document Ingestion
+# -----------------------------
+@dataclass
+class ParsedDocument:
+    """One parsed PDF, shared by the chatbot, summarizer and practice pages."""
+    name: str
+    hash: str
+    pages: list = field(default_factory=list)    # page texts, 0-based list of 1-based pages
+    text: str = ""                               # non-empty pages joined with "\n"
+    offsets: list = field(default_factory=list)  # start of each page within `text`
+
+
+def _build_document(name, doc_hash, page_texts):
+    parts = []
+    offsets = []
+    position = 0
+    for text in page_texts:
+        if text.strip() and parts:
+            position += 1  # the joining "\n"
+        offsets.append(position)
+        if text.strip():
+            parts.append(text)
+            position += len(text)
+    return ParsedDocument(name, doc_hash, page_texts, "\n".join(parts), offsets)
+
+
+def load_documents(pdf_files):
+    """Parse each upload at most once per content hash per process."""
+    items = [(file.name, file_bytes(file)) for file in pdf_files]
+    hashes = [content_hash(data) for _, data in items]
+
+    with _documents_lock:
+        found = {}
+        for h in hashes:
+            if h in _documents:
+                _documents.move_to_end(h)
+                found[h] = _documents[h]
+
+    # Parse every miss in one pooled pass (duplicates in the batch parse once)
+    missing = {}
+    for (name, data), h in zip(items, hashes):
+        if h not in found:
+            missing.setdefault(h, (name, data))
+    parsed = _extract_file_pages(list(missing.values()))
+
+    for (h, (name, _)), page_texts in zip(missing.items(), parsed):
+        if page_texts is None:
+            found[h] = ParsedDocument(name, h)  # unreadable: empty, not cached
             continue
+        found[h] = _build_document(name, h, page_texts)
+        with _documents_lock:
+            _documents[h] = found[h]
+            while len(_documents) > DOCUMENT_CACHE_SIZE:
+                _documents.popitem(last=False)
+
+    return [found[h] for h in hashes]
+
+
+def load_document(file):
+    return load_documents([file])[0]
+
 
+def document_set_hash(documents):
+    """Order-independent key for a set of readable documents."""
+    return content_hash(*sorted({doc.hash for doc in documents if doc.text}))
+
+
+def extract_pages_from_pdfs(pdf_files):
+    """Extract every page of every file, in upload and page order.
+
+    Returns a list of {"source", "page", "text"} dicts (pages are 1-based).
+    """
+    return [
+        {"source": file.name, "page": n + 1, "text": text}
+        for file, doc in zip(pdf_files, load_documents(pdf_files))
+        for n, text in enumerate(doc.pages)
+    ]
+
+
+def extract_text_from_pdfs(pdf_files):
+    # Join once instead of growing a string page by page
+    full_text = "\n".join(doc.text for doc in load_documents(pdf_files) if doc.text)
     return full_text.strip()
@@ -108,44 +108,114 @@
 #     )
 
 import os
-import subprocess
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-from PyPDF2 import PdfReader
+import re
+import numpy as np
 
-# Load sentence transformer for answer evaluation
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
+from modules.model_registry import get_sentence_transformer
+from modules.ollama_client import get_client
+from modules.pdf_handler import load_document
+from modules.question_sampler import PASSAGE_CHARS, generate_across_document
+
+PRACTICE_MODEL = "phi"
+MAX_GENERATION_ATTEMPTS = 3  # first request + retries for the missing questions
 
 # -----------------------------
 # PDF Text Extraction Utility
 # -----------------------------
 def extract_text_from_pdf(file):
-    reader = PdfReader(file)
-    text = ""
-    for page in reader.pages:
-        content = page.extract_text()
-        if content:
-            text += content + "\n"
-    return text.strip()
+    # Shared, per-process parse (see pdf_handler.load_document)
+    return load_document(file).text.strip()
 
 # -----------------------------
 # Ollama Availability Check
 # -----------------------------
 def is_ollama_available():
-    try:
-        subprocess.run(["ollama", "list"], capture_output=True, check=True)
-        return True
-    except Exception:
-        return False
+    # Cached for OLLAMA_HEALTH_TTL seconds; no process spawn per check
+    return get_client().is_available()
 
 # -----------------------------
-# Generate Questions using Ollama (phi)
+# Streaming Q/A Parser
 # -----------------------------
-def generate_eval_questions(text, num_questions=5):
-    if not is_ollama_available():
-        raise RuntimeError("❌ Ollama is not available. Please install and run Ollama with a model like 'phi'.")
+# "Q1:", "Q1.", "**Q1:**", "1. Q:", "Question 1 -", "A:", "Answer 1)" ...
+_QA_LINE = re.compile(
+    r"^[\s*#>-]*(?:(?P<lead>\d+)[.)]\s*)?(?:\*\*)?\s*(?P<kind>question|answer|q|a)\s*(?P<num>\d*)"
+    r"\s*(?:\*\*)?\s*(?P<sep>[:.)\-])\s*(?:\*\*)?\s*(?P<text>.*)$",
+    re.IGNORECASE,
+)
+
+
+# An answer written on its question's line: "Q1: What is X? A1: Y"
+_INLINE_ANSWER = re.compile(r"\s(?:\*\*)?(?:A|[Aa]nswer)\s*\d*\s*(?:\*\*)?\s*:\s*(?:\*\*)?\s*")
+
+
+def _split_inline_answer(text):
+    """(question text, answer text or None) for one line of a question."""
+    match = _INLINE_ANSWER.search(text)
+    if not match:
+        return text, None
+    return text[:match.start()], text[match.end():]
 
-    prompt = f"""
+
+def _is_strong_marker(match):
+    # Inside an answer, "a) first", "A-levels ..." or "q: ..." are answer text;
+    # only numbered markers, spelled-out ones, or "Q:" start something new
+    kind = match.group("kind")
+    return bool(
+        match.group("lead") or match.group("num") or len(kind) > 1
+        or (kind == "Q" and match.group("sep") == ":")
+    )
+
+
+def parse_qa_stream(lines):
+    """Yield {"question", "expected_answer"} pairs as soon as each one is complete.
+
+    Consumes any iterable of lines (e.g. a model's stdout); tolerates numbering
+    variations and questions or answers that continue over several lines.
+    """
+    question, answer = None, None
+
+    def pair():
+        q = " ".join(question).strip()
+        a = " ".join(answer).strip() if answer else ""
+        return {"question": q, "expected_answer": a} if q and a else None
+
+    for line in lines:
+        line = line.strip()
+        match = _QA_LINE.match(line)
+        if match and answer is not None and not _is_strong_marker(match):
+            match = None
+        kind = match.group("kind")[0].lower() if match else None
+        if kind == "q":
+            if question and answer:
+                done = pair()
+                if done:
+                    yield done
+            text, inline = _split_inline_answer(match.group("text"))
+            question, answer = [text], [inline] if inline is not None else None
+        elif kind == "a" and question is not None:
+            answer = [match.group("text")]
+        elif line and answer is not None:
+            answer.append(line)
+        elif line and question is not None:
+            text, inline = _split_inline_answer(line)
+            question.append(text)
+            if inline is not None:
+                answer = [inline]
+
+    if question and answer:
+        done = pair()
+        if done:
+            yield done
+
+
+# -----------------------------
+# Generate Questions using Ollama (phi)
+# -----------------------------
+def _question_prompt(text, num_questions, avoid=()):
+    avoid_block = ""
+    if avoid:
+        avoid_block = "\nDo NOT repeat these questions:\n" + "\n".join(f"- {q}" for q in avoid) + "\n"
+    return f"""
 You are an academic assistant.
 
 Your task is to generate exactly {num_questions} content-specific question-answer pairs from the given text.
@@ -153,9 +223,9 @@ Your task is to generate exactly {num_questions} content-specific question-answe
 ✅ Only create questions based on the text provided.
 ❌ Do NOT use external knowledge or add explanations.
 ❗ Ensure the response has exactly {num_questions} question-answer pairs.
-
+{avoid_block}
 TEXT:
-{text[:3000]}
+{text[:PASSAGE_CHARS]}
 
 FORMAT:
 Q1: <question>
@@ -166,69 +236,95 @@ A2: <ideal answer>
 Only return the Q/A pairs. No intro, no explanation.
 """
 
-    try:
-        result = subprocess.run(
-            ["ollama", "run", "phi"],
-            input=prompt.encode("utf-8"),
-            capture_output=True,
-            check=True,
-        )
-        output = result.stdout.decode("utf-8").strip().splitlines()
-    except subprocess.CalledProcessError as e:
-        print("❌ Ollama generation failed:", e.stderr.decode())
-        return []
 
-    # Parse QnA pairs from output
+def _stream_ollama(prompt):
+    """Yield the model's output line by line while it is still generating.
+
+    Closing the generator (enough questions) drops the connection, which
+    stops generation on the server.
+    """
+    yield from get_client().stream_lines(prompt, PRACTICE_MODEL)
+
+
+def _generate_from_passage(text, num_questions):
     questions = []
-    i = 0
-    while i < len(output) - 1:
-        if output[i].startswith("Q") and output[i + 1].startswith("A"):
-            try:
-                q = output[i].split(":", 1)[1].strip()
-                a = output[i + 1].split(":", 1)[1].strip()
-                if q and a:
-                    questions.append({"question": q, "expected_answer": a})
-                i += 2
-            except Exception:
-                i += 1
-        else:
-            i += 1
-
-    # Enforce exactly `num_questions`
-    if len(questions) > num_questions:
-        questions = questions[:num_questions]
-
-    # Retry once if insufficient
-    if len(questions) < num_questions:
-        print(f"⚠️ Only {len(questions)} questions generated. Retrying...")
-        return generate_eval_questions(text, num_questions)
-
-    return questions
+    seen = set()
+    for attempt in range(MAX_GENERATION_ATTEMPTS):
+        # Ask only for what is still missing
+        missing = num_questions - len(questions)
+        prompt = _question_prompt(text, missing, avoid=[q["question"] for q in questions])
+        try:
+            stream = _stream_ollama(prompt)
+            for qa in parse_qa_stream(stream):
+                key = " ".join(qa["question"].lower().split())
+                if key in seen:
+                    continue
+                seen.add(key)
+                questions.append(qa)
+                if len(questions) >= num_questions:
+                    stream.close()
+                    break
+        except Exception as e:
+            print("❌ Ollama generation failed:", e)
+
+        if len(questions) >= num_questions:
+            break
+        print(f"⚠️ Only {len(questions)} of {num_questions} questions generated (attempt {attempt + 1}/{MAX_GENERATION_ATTEMPTS}).")
+    return questions[:num_questions]
+
+
+def generate_eval_questions(text, num_questions=5, vectorstore=None):
+    if not is_ollama_available():
+        raise RuntimeError("❌ Ollama is not available. Please install and run Ollama with a model like 'phi'.")
+    get_client().warm_up(PRACTICE_MODEL)
+
+    questions = generate_across_document(text, num_questions, _generate_from_passage, vectorstore)
+    if not questions:
+        raise RuntimeError("❌ Ollama generation returned no questions.")
+    # Grading-time embeddings are computed now, once per question set
+    return embed_expected_answers(questions)
 
 # -----------------------------
 # Evaluate User Answers
 # -----------------------------
-def evaluate_user_answers(eval_questions, user_answers):
-    results = []
-    total_score = 0
-
-    for i, q in enumerate(eval_questions):
-        expected = q["expected_answer"]
-        user_resp = user_answers[i] if i < len(user_answers) else ""
+def embed_expected_answers(eval_questions):
+    """Attach a unit-length "expected_embedding" to each question, in one encode call.
+
+    Done once when questions are generated; the expected answers don't change
+    while the user is typing, so grading only has to encode the user's answers.
+    """
+    pending = [q for q in eval_questions if q.get("expected_embedding") is None]
+    if pending:
+        vectors = get_sentence_transformer().encode(
+            [q["expected_answer"] for q in pending], normalize_embeddings=True
+        )
+        for q, vector in zip(pending, vectors):
+            q["expected_embedding"] = vector
+    return eval_questions
 
-        embeddings = embedder.encode([expected, user_resp])
-        score = cosine_similarity([embeddings[0]], [embeddings[1]])[0][0]
 
-        results.append({
+def evaluate_user_answers(eval_questions, user_answers):
+    if not eval_questions:
+        return [], generate_feedback([]), 0.0
+    user_answers = [user_answers[i] if i < len(user_answers) else "" for i in range(len(eval_questions))]
+
+    # One batched forward pass for every user answer; cosine of unit vectors is a row-wise dot
+    embed_expected_answers(eval_questions)  # no-op when already precomputed
+    expected = np.stack([q["expected_embedding"] for q in eval_questions])
+    answers = get_sentence_transformer().encode(user_answers, normalize_embeddings=True)
+    scores = np.sum(expected * answers, axis=1)
+
+    results = [
+        {
             "question": q["question"],
-            "expected_answer": expected,
+            "expected_answer": q["expected_answer"],
             "user_answer": user_resp,
-            "score": score
-        })
-
-        total_score += score
+            "score": float(score)
+        }
+        for q, user_resp, score in zip(eval_questions, user_answers, scores)
+    ]
 
-    percentage_score = round((total_score / len(eval_questions)) * 100, 2)
+    percentage_score = round(float(scores.mean()) * 100, 2)
     feedback = generate_feedback(results)
 
     return results, feedback, percentage_score
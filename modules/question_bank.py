@@ -0,0 +1,134 @@
+# modules/question_bank.py
+import os
+import time
+import sqlite3
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.cache_utils import cache_path
+from modules.practice_utils import embed_expected_answers
+
+# Refill in the background once fewer unseen questions than this remain (one set's worth)
+QUESTION_BANK_LOW_WATER = int(os.environ.get("QUESTION_BANK_LOW_WATER", 5))
+QUESTION_BANK_BATCH = int(os.environ.get("QUESTION_BANK_BATCH", 10))
+# Rows kept per (document, kind); the most served questions go first
+QUESTION_BANK_MAX_PER_DOC = int(os.environ.get("QUESTION_BANK_MAX_PER_DOC", 50))
+
+_refill_pool = ThreadPoolExecutor(max_workers=2)
+_refilling = set()  # (document hash, kind) pairs with a top-up in flight
+_refilling_lock = threading.Lock()
+_db_path = None  # set once the schema exists
+_db_lock = threading.Lock()
+
+
+def _init_db():
+    path = os.path.join(cache_path("question_bank"), "bank.db")
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS questions ("
+                "doc_hash TEXT NOT NULL, kind TEXT NOT NULL, question TEXT NOT NULL, "
+                "expected_answer TEXT NOT NULL, embedding BLOB NOT NULL, "
+                "served INTEGER NOT NULL DEFAULT 0, created REAL NOT NULL, "
+                "PRIMARY KEY (doc_hash, kind, question))"
+            )
+    finally:
+        conn.close()
+    return path
+
+
+def _connect():
+    global _db_path
+    if _db_path is None:
+        with _db_lock:
+            if _db_path is None:
+                _db_path = _init_db()
+    return sqlite3.connect(_db_path, timeout=30)
+
+
+def bank_size(doc_hash, kind, unserved_only=False):
+    query = "SELECT COUNT(*) FROM questions WHERE doc_hash = ? AND kind = ?"
+    if unserved_only:
+        query += " AND served = 0"
+    with _connect() as conn:
+        return conn.execute(query, (doc_hash, kind)).fetchone()[0]
+
+
+def add_questions(doc_hash, kind, questions):
+    """Store Q/A pairs (with their answer embeddings) for a document; duplicates are ignored.
+
+    `kind` names the generator (e.g. "practice", "evaluation"); each keeps its own pool.
+    """
+    embed_expected_answers(questions)
+    now = time.time()
+    with _connect() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO questions (doc_hash, kind, question, expected_answer, embedding, created) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (doc_hash, kind, q["question"], q["expected_answer"],
+                 np.asarray(q["expected_embedding"], dtype=np.float32).tobytes(), now)
+                for q in questions
+            ],
+        )
+        # Keep the least served (then newest) questions within the per-document cap
+        conn.execute(
+            "DELETE FROM questions WHERE doc_hash = ? AND kind = ? AND question NOT IN ("
+            "SELECT question FROM questions WHERE doc_hash = ? AND kind = ? "
+            "ORDER BY served, created DESC LIMIT ?)",
+            (doc_hash, kind, doc_hash, kind, QUESTION_BANK_MAX_PER_DOC),
+        )
+
+
+def sample_questions(doc_hash, kind, num_questions):
+    """Draw a set, preferring questions served least often; embeddings come precomputed."""
+    with _connect() as conn:
+        chosen = conn.execute(
+            "SELECT question, expected_answer, embedding FROM questions "
+            "WHERE doc_hash = ? AND kind = ? ORDER BY served, RANDOM() LIMIT ?",
+            (doc_hash, kind, num_questions),
+        ).fetchall()
+        conn.executemany(
+            "UPDATE questions SET served = served + 1 WHERE doc_hash = ? AND kind = ? AND question = ?",
+            [(doc_hash, kind, row[0]) for row in chosen],
+        )
+    return [
+        {"question": q, "expected_answer": a, "expected_embedding": np.frombuffer(e, dtype=np.float32)}
+        for q, a, e in chosen
+    ]
+
+
+def _refill(doc_hash, kind, text, generate):
+    try:
+        add_questions(doc_hash, kind, generate(text, num_questions=QUESTION_BANK_BATCH))
+    except Exception as e:
+        print(f"⚠️ Question bank top-up failed: {e}")
+    finally:
+        with _refilling_lock:
+            _refilling.discard((doc_hash, kind))
+
+
+def top_up_async(doc_hash, kind, text, generate):
+    with _refilling_lock:
+        if (doc_hash, kind) in _refilling:
+            return
+        _refilling.add((doc_hash, kind))
+    _refill_pool.submit(_refill, doc_hash, kind, text, generate)
+
+
+def get_question_set(doc_hash, kind, text, num_questions, generate):
+    """Serve a question set from the bank, generating only when it can't cover the request.
+
+    `generate(text, num_questions=...)` is the page's LLM question generator.
+    """
+    if bank_size(doc_hash, kind) < num_questions:
+        add_questions(doc_hash, kind, generate(text, num_questions=num_questions))
+    questions = sample_questions(doc_hash, kind, num_questions)
+
+    # Keep fresh questions coming without making the user wait for them
+    if bank_size(doc_hash, kind, unserved_only=True) < QUESTION_BANK_LOW_WATER:
+        top_up_async(doc_hash, kind, text, generate)
+    return questions
@@ -0,0 +1,128 @@
+# modules/question_sampler.py
+import os
+import math
+import numpy as np
+import faiss
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.model_registry import get_sentence_transformer
+
+# Text sent with each generation call; same budget the single-prompt version used
+PASSAGE_CHARS = int(os.environ.get("QUESTION_PASSAGE_CHARS", 3000))
+QUESTION_CHUNK_CHARS = 1000
+QUESTION_CONCURRENCY = int(os.environ.get("QUESTION_CONCURRENCY", 4))
+QUESTION_OVERSAMPLE = 1.5  # headroom for questions dropped as duplicates
+QUESTION_DUP_THRESHOLD = float(os.environ.get("QUESTION_DUP_THRESHOLD", 0.9))
+
+
+def _split_text(text, size=QUESTION_CHUNK_CHARS):
+    chunks, current, length = [], [], 0
+    for word in text.split():
+        if length + len(word) > size and current:
+            chunks.append(" ".join(current))
+            current, length = [], 0
+        current.append(word)
+        length += len(word) + 1
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _vectorstore_chunks(vectorstore):
+    """Chunk texts and their stored vectors, in index (= document) order."""
+    total = vectorstore.index.ntotal
+    texts = [
+        vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).page_content
+        for i in range(total)
+    ]
+    try:
+        vectors = vectorstore.index.reconstruct_n(0, total)
+    except RuntimeError:
+        # IVF indexes without a direct map; the embedding cache makes this cheap
+        vectors = vectorstore.embedding_function.embed_documents(texts)
+    return texts, np.asarray(vectors, dtype=np.float32)
+
+
+def representative_passages(text, num_passages, vectorstore=None):
+    """Cluster the document's chunks and return one passage per cluster.
+
+    Each passage holds the chunks closest to its cluster centre, up to
+    PASSAGE_CHARS, so prompts stay the same size however long the document is.
+    """
+    if vectorstore is not None and vectorstore.index.ntotal:
+        chunks, vectors = _vectorstore_chunks(vectorstore)
+    else:
+        chunks = _split_text(text)
+        if not chunks:
+            return []
+        vectors = get_sentence_transformer().encode(chunks).astype(np.float32)
+
+    k = min(num_passages, len(chunks))
+    if k == len(chunks):
+        labels = np.arange(k)
+        distances = np.zeros(k, dtype=np.float32)
+    else:
+        kmeans = faiss.Kmeans(vectors.shape[1], k, niter=20, seed=1234, min_points_per_centroid=1)
+        kmeans.train(vectors)
+        distances, labels = kmeans.index.search(vectors, 1)
+        distances, labels = distances[:, 0], labels[:, 0]
+
+    passages = []
+    for cluster in range(k):
+        members = sorted(np.flatnonzero(labels == cluster), key=lambda i: distances[i])
+        picked, length = [], 0
+        for i in members:
+            if picked and length + len(chunks[i]) > PASSAGE_CHARS:
+                break
+            picked.append(i)
+            length += len(chunks[i])
+        if picked:
+            # Keep the picked chunks in reading order; passages ordered by first chunk
+            picked.sort()
+            passages.append((picked[0], "\n\n".join(chunks[i] for i in picked)[:PASSAGE_CHARS]))
+    return [passage for _, passage in sorted(passages)]
+
+
+def dedupe_questions(questions, threshold=QUESTION_DUP_THRESHOLD):
+    """Drop questions whose embedding is within `threshold` cosine of one already kept."""
+    if not questions:
+        return []
+    vectors = get_sentence_transformer().encode(
+        [q["question"] for q in questions], normalize_embeddings=True
+    )
+    kept = []
+    for i, vector in enumerate(vectors):
+        if all(float(vector @ vectors[j]) < threshold for j in kept):
+            kept.append(i)
+    return [questions[i] for i in kept]
+
+
+def generate_across_document(text, num_questions, generate_from_passage, vectorstore=None,
+                             concurrency=QUESTION_CONCURRENCY):
+    """Questions spread over the whole document rather than its opening pages.
+
+    `generate_from_passage(passage, n)` returns up to n Q/A dicts for one passage;
+    passages are processed concurrently by at most `concurrency` workers.
+    """
+    passages = representative_passages(text, num_questions, vectorstore)
+    if not passages:
+        return []
+    per_passage = math.ceil(num_questions * QUESTION_OVERSAMPLE / len(passages))
+
+    def generate(passage):
+        try:
+            return generate_from_passage(passage, per_passage)
+        except Exception as e:
+            print(f"⚠️ Question generation failed for one passage: {e}")
+            return []
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        per_cluster = list(pool.map(generate, passages))
+
+    # Round-robin over clusters so a short result still covers the whole document
+    interleaved = [
+        group[i]
+        for i in range(max(len(group) for group in per_cluster))
+        for group in per_cluster if i < len(group)
+    ]
+    return dedupe_questions(interleaved)[:num_questions]
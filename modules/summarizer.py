@@ -1,21 +1,41 @@
 import os
 import cohere
 import re
-from PyPDF2 import PdfReader
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.cache_utils import DiskCache, content_hash, file_bytes
+from modules.pdf_handler import load_document
+from modules.ollama_client import get_client
 
 # Setup Cohere client
 COHERE_API_KEY = os.getenv("COHERE_API_KEY")
-co = cohere.Client(COHERE_API_KEY)
+co = cohere.Client(COHERE_API_KEY) if COHERE_API_KEY else None
+
+# Backend: Cohere when a key is configured, otherwise a local Ollama model
+SUMMARY_BACKEND = os.getenv("SUMMARY_BACKEND", "cohere" if co else "ollama")
+SUMMARY_OLLAMA_MODEL = os.getenv("SUMMARY_OLLAMA_MODEL", "gemma3:1b")
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", 4))
+SUMMARY_TARGET_WORDS = int(os.getenv("SUMMARY_TARGET_WORDS", 400))
+MAX_REDUCE_PASSES = 4
+SUMMARY_CACHE_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", 256 * 1024 ** 2))
+
+# Shared by every session: whole-document and per-chunk summaries
+_cache = DiskCache("summaries", max_bytes=SUMMARY_CACHE_MAX_BYTES)
+
+MAP_PROMPT = (
+    "Summarize the following content **concisely**. Extract only the **most important, relevant facts or findings**. "
+    "Avoid repetition and unnecessary detail. Be brief and clear.\n\n"
+)
+REDUCE_PROMPT = (
+    "The following are summaries of consecutive parts of one document. Merge them into a single concise summary, "
+    "keeping only the most important facts and findings and removing any repetition.\n\n"
+)
 
 # === PDF Text Extractor ===
 def extract_text_from_pdf(file):
-    reader = PdfReader(file)
-    text = ""
-    for page in reader.pages:
-        page_text = page.extract_text()
-        if page_text:
-            text += page_text + "\n"
-    return text.strip()
+    # Shared, per-process parse (see pdf_handler.load_document)
+    return load_document(file).text.strip()
 
 # === Chunking by Sentence ===
 def split_text_into_chunks(text, max_words=500):
@@ -25,44 +45,156 @@ def split_text_into_chunks(text, max_words=500):
     current_len = 0
 
     for sentence in sentences:
-        word_count = len(sentence.split())
-        if current_len + word_count <= max_words:
-            current_chunk.append(sentence)
-            current_len += word_count
-        else:
-            chunks.append(" ".join(current_chunk))
-            current_chunk = [sentence]
-            current_len = word_count
+        words = sentence.split()
+        if not words:
+            continue
+        # A run with no sentence break (tables, lists) is cut every max_words words
+        pieces = [sentence] if len(words) <= max_words else [
+            " ".join(words[i:i + max_words]) for i in range(0, len(words), max_words)
+        ]
+        for piece in pieces:
+            word_count = len(piece.split())
+            if current_len + word_count <= max_words:
+                current_chunk.append(piece)
+                current_len += word_count
+            else:
+                if current_chunk:
+                    chunks.append(" ".join(current_chunk))
+                current_chunk = [piece]
+                current_len = word_count
 
     if current_chunk:
         chunks.append(" ".join(current_chunk))
 
     return chunks
 
-# === Summarizer ===
-def summarize_pdf(file):
-    full_text = extract_text_from_pdf(file)
-    chunks = split_text_into_chunks(full_text, max_words=500)
+# === Backends ===
+def _summarize_with_cohere(prompt):
+    if not co:
+        raise RuntimeError("Cohere API key not configured.")
+    response = co.summarize(
+        text=prompt,
+        length="short",  # 'short' = concise
+        format="paragraph",
+        model="command-r-plus"
+    )
+    return response.summary
+
+
+def _summarize_with_ollama(prompt):
+    return get_client().generate(prompt, SUMMARY_OLLAMA_MODEL).strip()
 
-    print(f"🔹 Splitting into {len(chunks)} chunks...")
 
-    summaries = []
-    for i, chunk in enumerate(chunks):
+def _model_settings():
+    model = SUMMARY_OLLAMA_MODEL if SUMMARY_BACKEND == "ollama" else "command-r-plus"
+    return (SUMMARY_BACKEND, model)
+
+
+def summarize_text(prompt):
+    if SUMMARY_BACKEND == "ollama":
+        return _summarize_with_ollama(prompt)
+    return _summarize_with_cohere(prompt)
+
+
+# === Map-Reduce Summarizer ===
+def _summarize_all(texts, instruction, label, progress=None):
+    """Summarize each text concurrently (capped at SUMMARY_CONCURRENCY), keeping order.
+
+    Results are cached per (settings, prompt, text), so an edited document only
+    re-summarizes the chunks that changed. `progress(done, total, message)` is
+    called as each text finishes.
+    """
+    keys = [content_hash(*_model_settings(), instruction, text) for text in texts]
+    cached = _cache.get_many(keys)
+    finished = [0]
+    finished_lock = threading.Lock()
+
+    def report():
+        if progress:
+            with finished_lock:
+                finished[0] += 1
+                done = finished[0]
+            progress(done, len(texts), f"Summarized {label} {done}/{len(texts)}")
+
+    def run(item):
+        i, text = item
+        if keys[i] in cached:
+            report()
+            return cached[keys[i]].decode("utf-8"), None
         try:
-            prompt = (
-                "Summarize the following content **concisely**. Extract only the **most important, relevant facts or findings**. "
-                "Avoid repetition and unnecessary detail. Be brief and clear.\n\n" + chunk
-            )
-
-            response = co.summarize(
-                text=prompt,
-                length="short",  # 'short' = concise
-                format="paragraph",
-                model="command-r-plus"
-            )
-            summaries.append(response.summary)
+            summary = summarize_text(instruction + text)
         except Exception as e:
-            summaries.append(f"[Failed to summarize chunk {i+1}: {e}]")
+            report()
+            return None, f"[Failed to summarize {label} {i+1}: {e}]"
+        _cache.set(keys[i], summary.encode("utf-8"))
+        report()
+        return summary, None
+
+    with ThreadPoolExecutor(max_workers=max(1, SUMMARY_CONCURRENCY)) as pool:
+        try:
+            return list(pool.map(run, enumerate(texts)))
+        except BaseException:
+            pool.shutdown(cancel_futures=True)  # e.g. job cancelled: skip chunks not started
+            raise
+
+
+def _word_count(texts):
+    return sum(len(t.split()) for t in texts)
+
+
+def reduce_summaries(summaries, target_words=SUMMARY_TARGET_WORDS, max_words=500, progress=None):
+    """Merge partial summaries pass by pass until they fit `target_words`.
+
+    Returns (summary, failure notes). A group whose merge failed is kept
+    unreduced, so no part of the document drops out of the summary.
+    """
+    failures = []
+    for _ in range(MAX_REDUCE_PASSES):
+        if _word_count(summaries) <= target_words:
+            break
+        # Each reduce call sees a group of neighbouring summaries that fits one prompt
+        groups = split_text_into_chunks(" ".join(summaries), max_words=max_words)
+        results = _summarize_all(groups, REDUCE_PROMPT, "section", progress)
+        failures.extend(err for _, err in results if err)
+        if all(s is None for s, _ in results):
+            break
+        summaries = [s if s else group for (s, _), group in zip(results, groups)]
+    return "\n\n".join(summaries), list(dict.fromkeys(failures))
+
+
+# === Summarizer ===
+def summary_key(file, target_words=SUMMARY_TARGET_WORDS):
+    # Same PDF bytes + same model/length settings -> same summary
+    return content_hash(content_hash(file_bytes(file)), *_model_settings(), target_words)
+
+
+def summarize_pdf(file, target_words=SUMMARY_TARGET_WORDS, progress=None):
+    doc_key = summary_key(file, target_words)
+    stored = _cache.get(doc_key)
+    if stored is not None:
+        return stored.decode("utf-8")
+
+    # Chunk page by page: an edit only moves chunk boundaries (and cache keys) on its own page
+    chunks = [
+        chunk
+        for page in load_document(file).pages
+        for chunk in split_text_into_chunks(page.strip(), max_words=500)
+    ]
+
+    print(f"🔹 Splitting into {len(chunks)} chunks...")
+
+    # Map: every chunk concurrently
+    mapped = _summarize_all(chunks, MAP_PROMPT, "chunk", progress)
+    summaries = [s for s, _ in mapped if s]
+    failures = [err for _, err in mapped if err]
+    if not summaries:
+        return "\n\n".join(failures)
 
-    final_summary = "\n\n".join(summaries)
+    # Reduce: hierarchical merge down to the target length
+    final_summary, reduce_failures = reduce_summaries(summaries, target_words, progress=progress)
+    failures += reduce_failures
+    if failures:
+        # Partial result: don't store it, so a retry gets another chance
+        return final_summary + "\n\n" + "\n".join(failures)
+    _cache.set(doc_key, final_summary.encode("utf-8"))
     return final_summary
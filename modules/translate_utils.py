@@ -1,10 +1,154 @@
 # modules/translate_utils.py
 
+import os
+import re
 from deep_translator import GoogleTranslator
 
+from modules.cache_utils import DiskCache, content_hash
+
+# "google" (deep_translator) or "offline" (local stand-in for testing)
+TRANSLATION_BACKEND = os.environ.get("TRANSLATION_BACKEND", "google")
+TRANSLATION_CACHE_MAX_BYTES = int(os.environ.get("TRANSLATION_CACHE_MAX_BYTES", 64 * 1024 ** 2))
+MAX_REQUEST_CHARS = 4500  # Google rejects requests over 5000 characters
+
+_cache = DiskCache("translations", max_bytes=TRANSLATION_CACHE_MAX_BYTES)
+
+# Candidate sentence ends and line breaks; see _split_sentences
+_SEGMENT_BREAK = re.compile(r"(?<=[.!?।])[ \t]+|\n+")
+# A period after these ends the word, not the sentence ("Dr. Smith", "approx. 5")
+_ABBREVIATIONS = frozenset(
+    "mr mrs ms dr prof sr jr st vs etc al fig figs eq no nos vol approx dept est inc ltd co corp cf".split()
+)
+_INITIALISM = re.compile(r"(?:[a-z]\.)+[a-z]")  # "e.g", "i.e", "u.s"
+
+
+# -----------------------------
+# Backends
+# -----------------------------
+class GoogleBackend:
+    name = "google"
+
+    def __init__(self):
+        self._translators = {}  # one client per target language
+
+    def translate_batch(self, texts, target_lang):
+        translator = self._translators.get(target_lang)
+        if translator is None:
+            translator = self._translators[target_lang] = GoogleTranslator(source='auto', target=target_lang)
+
+        # Pack segments into as few requests as fit, one segment per line
+        results = []
+        for group in _pack(texts, MAX_REQUEST_CHARS):
+            translated = translator.translate("\n".join(group)).split("\n")
+            if len(translated) != len(group):
+                # Line structure not preserved: fall back to one request per segment
+                translated = [translator.translate(text) for text in group]
+            results.extend(t.strip() for t in translated)
+        return results
+
+
+class OfflineBackend:
+    """Offline stand-in: tags each segment with the target language."""
+    name = "offline"
+
+    def translate_batch(self, texts, target_lang):
+        return [f"[{target_lang}] {text}" for text in texts]
+
+
+_backends = {"google": GoogleBackend, "offline": OfflineBackend}
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = _backends[TRANSLATION_BACKEND]()
+    return _backend
+
+
+# -----------------------------
+# Segmentation Helpers
+# -----------------------------
+def _pack(texts, max_chars):
+    group, size = [], 0
+    for text in texts:
+        if group and size + len(text) + 1 > max_chars:
+            yield group
+            group, size = [], 0
+        group.append(text)
+        size += len(text) + 1
+    if group:
+        yield group
+
+
+def _is_abbreviation(text):
+    word = text.rsplit(None, 1)[-1].lstrip("([\"'").rstrip(".").lower() if text.strip() else ""
+    return word in _ABBREVIATIONS or (len(word) == 1 and word.isalpha()) or bool(_INITIALISM.fullmatch(word))
+
+
+def _split_sentences(text):
+    """[sentence, separator, sentence, ..., sentence], like re.split with a captured separator."""
+    parts, start = [], 0
+    for match in _SEGMENT_BREAK.finditer(text):
+        if "\n" not in match.group():
+            following = text[match.end():match.end() + 1]
+            before = text[start:match.start()]
+            # Not a sentence end: an abbreviation, or the text carries on in lower case
+            if following.islower() or (before.endswith(".") and _is_abbreviation(before)):
+                continue
+        parts += [text[start:match.start()], match.group()]
+        start = match.end()
+    parts.append(text[start:])
+    return parts
+
+
+def _split_long(segment, max_chars):
+    """[(piece, separator), ...] for a sentence over the backend limit."""
+    # Cut at word boundaries; a run without spaces (URLs, CJK text) is cut by characters
+    pieces, current = [], ""
+    for word in segment.split(" "):
+        if current and len(current) + len(word) + 1 > max_chars:
+            pieces.append((current, " "))
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+        while len(current) > max_chars:
+            pieces.append((current[:max_chars], ""))
+            current = current[max_chars:]
+    pieces.append((current, ""))
+    return pieces
+
+
+def _segments(text):
+    """Split into [(segment, separator), ...]; only segments get translated."""
+    parts = _split_sentences(text)
+    pairs = []
+    for i in range(0, len(parts), 2):
+        separator = parts[i + 1] if i + 1 < len(parts) else ""
+        pieces = _split_long(parts[i], MAX_REQUEST_CHARS) if len(parts[i]) > MAX_REQUEST_CHARS else [(parts[i], "")]
+        pairs.extend(pieces[:-1])
+        pairs.append((pieces[-1][0], separator))
+    return pairs
+
+
+# -----------------------------
+# Translation
+# -----------------------------
 def translate_text(text, target_lang):
     try:
-        translated = GoogleTranslator(source='auto', target=target_lang).translate(text)
-        return translated
+        backend = get_backend()
+        pairs = _segments(text)
+        keys = {seg: content_hash(backend.name, target_lang, seg) for seg, _ in pairs if seg.strip()}
+        cached = _cache.get_many(keys.values())
+
+        # Only segments never seen before for this language go to the backend
+        missing = [seg for seg, key in keys.items() if key not in cached]
+        translated = {seg: cached[key].decode("utf-8") for seg, key in keys.items() if key in cached}
+        if missing:
+            results = backend.translate_batch(missing, target_lang)
+            translated.update(zip(missing, results))
+            _cache.set_many({keys[seg]: result.encode("utf-8") for seg, result in zip(missing, results)})
+
+        return "".join(translated.get(seg, seg) + sep for seg, sep in pairs)
     except Exception as e:
         return f"Translation error: {str(e)}"
@@ -1,9 +1,25 @@
 # modules/voice_utils.py
+import os
+import io
+import re
+import wave
+import tempfile
+import threading
 import speech_recognition as sr
 from gtts import gTTS
-import tempfile
 import streamlit as st
-import re
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.cache_utils import DiskCache, content_hash
+
+# "gtts" (network) or "pyttsx3" (offline, uses the system speech engine)
+TTS_ENGINE = os.environ.get("TTS_ENGINE", "gtts")
+TTS_CACHE_MAX_BYTES = int(os.environ.get("TTS_CACHE_MAX_BYTES", 128 * 1024 ** 2))
+TTS_SEGMENT_CHARS = 300  # sentences are grouped into segments of about this size
+
+_audio_cache = DiskCache("tts", max_bytes=TTS_CACHE_MAX_BYTES)
+_synth_pool = ThreadPoolExecutor(max_workers=4)
+_pyttsx3_lock = threading.Lock()  # the system engine is not thread-safe
 
 def transcribe_audio():
     r = sr.Recognizer()
@@ -15,30 +31,131 @@ def transcribe_audio():
     except Exception as e:
         return f"Error: {str(e)}"
 
+# Markdown cleanup for speech, compiled once. Lines are tokenized a single time
+# for block markup (bullets, headings, quotes, rules, code fences); inline markup
+# is removed by scans that each start on a literal character, so the regex
+# engine skips plain prose instead of trying every alternative at every
+# position, and the always-dropped characters go in one str.translate call.
+# Markers are dropped wherever they stand, so nested (***x***) and unmatched
+# markers can't swallow text; "_" inside a word (snake_case), "#" outside
+# headings (C#) and ">" outside quotes (a > b) are left alone.
+_BLOCK_START = frozenset("*-+•#>`_")
+_BLOCK_MARKUP = re.compile(r"[ \t]*(?:[-*_]{3,}[ \t]*$|(?:(?:[*\-+•]+|\#{1,6}|>)[ \t]+|>)+)")
+_IMAGE = re.compile(r"!\[([^\]\n]*)\]\([^)\n]*\)")
+_LINK = re.compile(r"\[([^\]\n]*)\]\([^)\n]*\)")
+_UNDERSCORES = re.compile(r"_(?<!\w_)_*|_(?<!__)_*(?!\w)")
+_DROP = str.maketrans("", "", "*~`•")
+
+
 def clean_text_for_tts(text):
-    # Remove markdown formatting like **bold**, *italic*, __underline__, etc.
-    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)  # **bold**
-    text = re.sub(r'\*(.*?)\*', r'\1', text)      # *italic*
-    text = re.sub(r'__(.*?)__', r'\1', text)      # __underline__
-    
-    # Remove leading bullets or symbols from each line
-    text = re.sub(r'^\s*[\*\-•]+\s*', '', text, flags=re.MULTILINE)
+    # Remove markdown formatting like **bold**, *italic*, __underline__, bullets, links, etc.
+    lines = []
+    for line in text.split("\n"):
+        head = line.lstrip(" \t")[:1]
+        if head and head in _BLOCK_START:
+            if line.lstrip(" \t").startswith("```"):
+                continue  # code fence (and its language tag)
+            markup = _BLOCK_MARKUP.match(line)
+            if markup:
+                line = line[markup.end():]
+        lines.append(line)
+    text = "\n".join(lines)
+
+    if "](" in text:
+        text = _LINK.sub(r"\1", _IMAGE.sub(r"\1", text))
+    if "_" in text:
+        text = _UNDERSCORES.sub("", text)
+    return text.translate(_DROP).strip()
+
+# -----------------------------
+# Speech Engines
+# -----------------------------
+def _synthesize_gtts(text, lang):
+    # Straight into memory: no temp file to leak
+    buffer = io.BytesIO()
+    gTTS(text, lang=lang).write_to_fp(buffer)
+    return buffer.getvalue(), "audio/mp3"
+
+
+def _synthesize_pyttsx3(text, lang):
+    if not lang.lower().startswith("en"):
+        # The system's default voice would read the text with English pronunciation
+        raise RuntimeError(f"The offline speech engine only speaks English, not '{lang}'. Use TTS_ENGINE=gtts.")
+    import pyttsx3  # optional, offline; speaks with the system's default voice
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        with _pyttsx3_lock:
+            engine = pyttsx3.init()
+            engine.save_to_file(text, path)
+            engine.runAndWait()
+        with open(path, "rb") as f:
+            return f.read(), "audio/wav"
+    finally:
+        os.remove(path)
+
+
+_ENGINES = {"gtts": _synthesize_gtts, "pyttsx3": _synthesize_pyttsx3}
+
+
+def synthesize(text, lang='en', engine=None):
+    """Audio bytes and mime type for `text`, cached by (engine, lang, text)."""
+    engine = engine or TTS_ENGINE
+    key = content_hash(engine, lang, text)
+    cached = _audio_cache.get(key)
+    if cached is not None:
+        mime, _, audio = cached.partition(b"\n")
+        return audio, mime.decode()
+    audio, mime = _ENGINES[engine](text, lang)
+    _audio_cache.set(key, mime.encode() + b"\n" + audio)
+    return audio, mime
+
+
+def split_for_speech(text, max_chars=TTS_SEGMENT_CHARS):
+    sentences = [s for s in re.split(r'(?<=[.!?])\s+|\n+', text) if s.strip()]
+    segments, current = [], ""
+    for sentence in sentences:
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            segments.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        segments.append(current)
+    return segments
+
+
+def synthesize_segments(text, lang='en'):
+    """Yield (audio, mime) segment by segment, in order, as soon as each is ready."""
+    futures = [_synth_pool.submit(synthesize, segment, lang) for segment in split_for_speech(text)]
+    for future in futures:
+        yield future.result()
 
-    # Remove leftover markdown/control characters
-    text = re.sub(r'[•*_~`>#]', '', text)
 
-    # Collapse multiple spaces into one
-    # text = re.sub(r'\s+', ' ', text)
+def join_audio(segments):
+    """One clip from consecutive (audio, mime) segments of the same engine."""
+    segments = list(segments)
+    if not segments:
+        return b"", "audio/mp3"
+    mime = segments[0][1]
+    if mime != "audio/wav":
+        return b"".join(audio for audio, _ in segments), mime  # MP3 frames concatenate as-is
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        for i, (audio, _) in enumerate(segments):
+            with wave.open(io.BytesIO(audio), "rb") as part:
+                if i == 0:
+                    out.setparams(part.getparams())
+                out.writeframes(part.readframes(part.getnframes()))
+    return buffer.getvalue(), mime
 
-    return text.strip()
 
 def speak_text(text, lang='en'):
     try:
         cleaned = clean_text_for_tts(text)
-        tts = gTTS(cleaned, lang=lang)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp:
-            tts.save(tmp.name)
-            audio_bytes = open(tmp.name, 'rb').read()
-            st.audio(audio_bytes, format="audio/mp3")
+        # Segments synthesize in parallel and play back as one clip
+        audio_bytes, mime = join_audio(synthesize_segments(cleaned, lang))
+        if audio_bytes:
+            st.audio(audio_bytes, format=mime)
     except Exception as e:
         st.error(f"Text-to-speech error: {str(e)}")
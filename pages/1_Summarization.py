@@ -1,5 +1,8 @@
+import io
 import streamlit as st
-from modules.summarizer import summarize_pdf
+from modules.summarizer import summarize_pdf, summary_key
+from modules.cache_utils import content_hash, file_bytes
+from modules.job_queue import submit_job, job_result, show_job_progress, ACTIVE, DONE, FAILED
 
 st.set_page_config(page_title="📄 PDF Summarization")
 st.title("📝 PDF Summarization")
@@ -8,25 +11,49 @@ st.title("📝 PDF Summarization")
 st.sidebar.page_link("app.py", label="⬅️ Back to Chatbot", icon="🏠")
 pdf_files = st.sidebar.file_uploader("📂 Upload PDF files to summarize", accept_multiple_files=True)
 
+
+@st.fragment(run_every=1)
+def summary_job_status(pdf_key, job_id, name):
+    job = show_job_progress(job_id, "Summarizing")
+    if job is None or job["status"] in ACTIVE:
+        return
+    if job["status"] == DONE:
+        st.session_state.summaries[pdf_key] = job_result(job_id)
+        st.rerun()
+    if job["status"] == FAILED:
+        st.error(f"❌ Failed to summarize {name}: {job['error']}")
+    else:
+        st.info("✖️ Summarization cancelled.")
+    if st.button("🔁 Retry", key=f"retry_{job_id}"):
+        st.session_state.summary_jobs.pop(pdf_key, None)
+        st.rerun()
+
+
 if not pdf_files:
     st.info("Please upload PDF files using the sidebar to generate summaries.")
 else:
     if "summaries" not in st.session_state:
         st.session_state.summaries = {}
+    if "summary_jobs" not in st.session_state:
+        st.session_state.summary_jobs = {}
 
     for pdf in pdf_files:
         st.markdown(f"### 📘 {pdf.name}")
-        if pdf.name not in st.session_state.summaries:
-            try:
-                with st.spinner("Summarizing..."):
-                    summary = summarize_pdf(pdf)
-                st.session_state.summaries[pdf.name] = summary
-            except Exception as e:
-                st.error(f"❌ Failed to summarize {pdf.name}: {e}")
-                continue  # Skip download if failed
+        # Key by content, so two different files with the same name never collide
+        pdf_key = content_hash(file_bytes(pdf))
+        if pdf_key not in st.session_state.summaries:
+            if pdf_key not in st.session_state.summary_jobs:
+                data = io.BytesIO(file_bytes(pdf))
+                data.name = pdf.name
+                # Keyed by content and settings: a refresh (or another session) joins a running job
+                st.session_state.summary_jobs[pdf_key] = submit_job(
+                    "summarize", summarize_pdf, data, key=summary_key(data)
+                )
+            summary_job_status(pdf_key, st.session_state.summary_jobs[pdf_key], pdf.name)
+            continue  # Download appears once the summary is ready
 
         # Display the summary
-        summary = st.session_state.summaries[pdf.name]
+        summary = st.session_state.summaries[pdf_key]
         st.markdown("**Summary:**")
         st.success(summary)
 
@@ -1,26 +1,68 @@
 import streamlit as st
 import matplotlib.pyplot as plt
 import numpy as np
-from modules.evaluation_utils import generate_eval_questions, evaluate_responses
+from functools import partial
+from modules.evaluation_utils import generate_eval_questions, evaluate_responses, EVAL_CONCURRENCY
+from modules.question_bank import get_question_set
+from modules.cache_utils import content_hash
+from modules.job_queue import submit_job, job_result, show_job_progress, ACTIVE, DONE, FAILED
 
 st.set_page_config(page_title="📊 Evaluation Dashboard", layout="wide")
 st.title("🧪 Chatbot Evaluation Dashboard")
 
 # Sidebar Navigation
 st.sidebar.page_link("app.py", label="⬅️ Back to Chatbot", icon="🏠")
+concurrency = st.sidebar.slider("⚡ Parallel requests", 1, 16, EVAL_CONCURRENCY)
 
 # Validate Required Session Data
 if not st.session_state.get("uploaded_text") or not st.session_state.get("chat_chain"):
     st.warning("⚠️ Please upload and process a PDF in the main chatbot page first.")
     st.stop()
 
+def run_evaluation(doc_hash, text, vectorstore, chain, concurrency, progress):
+    progress(0, 1, "Generating questions...")
+    eval_questions = get_question_set(
+        doc_hash, "evaluation", text, num_questions=5,
+        generate=partial(generate_eval_questions, vectorstore=vectorstore)
+    )
+    return evaluate_responses(eval_questions, chain, concurrency=concurrency, progress=progress)
+
+
+@st.fragment(run_every=1)
+def evaluation_job_status():
+    job = show_job_progress(st.session_state.evaluation_job, "Evaluating")
+    if job is not None and job["status"] in ACTIVE:
+        return
+    st.session_state.evaluation_job = None
+    if job is None:
+        st.session_state.evaluation_notice = ("error", "❌ Evaluation failed: the job's result is no longer available")
+    elif job["status"] == DONE:
+        st.session_state["evaluation_results"] = job_result(job["id"])
+        st.session_state.evaluation_notice = ("success", "✅ Evaluation complete!")
+    elif job["status"] == FAILED:
+        st.session_state.evaluation_notice = ("error", f"❌ Evaluation failed: {job['error']}")
+    else:
+        st.session_state.evaluation_notice = ("info", "✖️ Evaluation cancelled.")
+    st.rerun()
+
+
 # Trigger Evaluation
-if st.button("🔍 Generate Questions & Evaluate"):
-    with st.spinner("Generating questions and evaluating..."):
-        eval_questions = generate_eval_questions(st.session_state.uploaded_text)
-        results = evaluate_responses(eval_questions, st.session_state.chat_chain)
-        st.session_state["evaluation_results"] = results
-    st.success("✅ Evaluation complete!")
+if st.button("🔍 Generate Questions & Evaluate", disabled=bool(st.session_state.get("evaluation_job"))):
+    st.session_state.evaluation_job = submit_job(
+        "evaluate",
+        run_evaluation,
+        st.session_state.get("doc_set_hash") or content_hash(st.session_state.uploaded_text),
+        st.session_state.uploaded_text,
+        st.session_state.get("vectorstore"),
+        st.session_state.chat_chain,
+        concurrency,
+    )
+
+if st.session_state.get("evaluation_job"):
+    evaluation_job_status()
+if st.session_state.get("evaluation_notice"):
+    level, notice = st.session_state.pop("evaluation_notice")
+    getattr(st, level)(notice)
 
 # Results Rendering
 if st.session_state.get("evaluation_results"):
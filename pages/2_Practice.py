@@ -1,6 +1,9 @@
 # pages/2_Practice.py
 import streamlit as st
+from functools import partial
 from modules.practice_utils import generate_eval_questions, evaluate_user_answers
+from modules.question_bank import get_question_set
+from modules.cache_utils import content_hash
 
 st.set_page_config(page_title="📝 Practice Mode")
 
@@ -22,9 +25,13 @@ if "practice_answers" not in st.session_state:
 if st.button("🧠 Generate Practice Questions"):
     with st.spinner("Generating questions..."):
         try:
-            st.session_state.practice_questions = generate_eval_questions(
+            doc_hash = st.session_state.get("doc_set_hash") or content_hash(st.session_state.uploaded_text)
+            st.session_state.practice_questions = get_question_set(
+                doc_hash,
+                "practice",
                 st.session_state.uploaded_text,
-                num_questions=5  # default to 5 for faster feedback
+                num_questions=5,  # default to 5 for faster feedback
+                generate=partial(generate_eval_questions, vectorstore=st.session_state.get("vectorstore"))
             )
             st.session_state.practice_answers = {}  # reset previous answers
         except Exception as e:
@@ -35,8 +42,7 @@ if st.session_state.practice_questions:
     st.subheader("📘 Answer the following questions:")
 
     for i, q in enumerate(st.session_state.practice_questions):
-        question_text = q['question'].split("A")[0].strip()  # remove any trailing A1: answer if included
-        st.markdown(f"**Q{i+1}: {question_text}**")
+        st.markdown(f"**Q{i+1}: {q['question']}**")
         user_input = st.text_area(
             label="Your Answer:",
             key=f"user_answer_{i}",
@@ -0,0 +1,8 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+# Modules read the cache root at import time: keep test runs out of the real cache
+os.environ.setdefault("PDF_ASSISTANT_CACHE_DIR", tempfile.mkdtemp(prefix="pdf-assistant-tests-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,44 @@
+# tests/fakes.py
+# Offline stand-ins for the Cohere judge and the retrieval chain
+import time
+
+
+class _Generation:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Response:
+    def __init__(self, text):
+        self.generations = [_Generation(text)]
+
+
+class LocalJudge:
+    """Stand-in for the Cohere client: scores by word overlap."""
+
+    def __init__(self, latency=0.0, failures=()):
+        self.latency = latency
+        self.failures = list(failures)  # raised, in order, before any score is returned
+        self.calls = 0
+
+    def generate(self, model, prompt, max_tokens, temperature):
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.failures:
+            raise self.failures.pop(0)
+        expected = prompt.split("EXPECTED:")[1].split("ANSWER:")[0].lower().split()
+        answer = prompt.split("ANSWER:")[1].split("Respond only with:")[0].lower().split()
+        overlap = len(set(expected) & set(answer)) / max(len(set(expected)), 1)
+        return _Response(f"Score: {overlap:.2f}")
+
+
+class LocalChatChain:
+    """Stand-in for the retrieval chain: echoes the question back."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.memory = None
+
+    def invoke(self, inputs):
+        time.sleep(self.latency)
+        return {"answer": f"Answer to: {inputs['question']}"}
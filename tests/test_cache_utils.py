@@ -0,0 +1,41 @@
+# tests/test_cache_utils.py
+import os
+import time
+
+from modules.cache_utils import DiskCache, content_hash, evict_lru, touch
+
+
+def test_content_hash_separates_parts():
+    assert content_hash("ab", "c") != content_hash("a", "bc")
+    assert content_hash("x", 1) == content_hash("x", 1)
+    assert content_hash(b"x") == content_hash("x")
+
+
+def test_disk_cache_round_trip(tmp_path):
+    cache = DiskCache(f"test-{tmp_path.name}-round-trip")
+    cache.set_many({"a": b"1", "b": b"2"})
+    assert cache.get("a") == b"1"
+    assert cache.get_many(["a", "b", "missing", "a"]) == {"a": b"1", "b": b"2"}
+    assert cache.get("missing") is None
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(f"test-{tmp_path.name}-eviction", max_bytes=1000)
+    for key in "abcd":
+        cache.set(key, b"x" * 200)
+        time.sleep(0.01)
+    cache.get("a")  # now the most recently used
+    time.sleep(0.01)
+    cache.set("e", b"x" * 300)  # 1100 bytes: dropping b, the oldest, gets back to 900
+
+    assert cache.get_many("abcde").keys() == {"a", "c", "d", "e"}
+
+
+def test_evict_lru_keeps_recent_and_pinned_entries(tmp_path):
+    for i, name in enumerate(["old", "pinned", "recent"]):
+        (tmp_path / name).write_bytes(b"x" * 10)
+        os.utime(tmp_path / name, (1000 + i, 1000 + i))
+    touch(str(tmp_path / "old"))
+
+    evict_lru(str(tmp_path), max_entries=2, keep={"pinned"})
+    assert sorted(os.listdir(tmp_path)) == ["old", "pinned"]
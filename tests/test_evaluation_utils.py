@@ -0,0 +1,42 @@
+# tests/test_evaluation_utils.py
+import time
+
+import pytest
+
+pytest.importorskip("cohere")
+
+from modules import evaluation_utils
+from modules.evaluation_utils import generate_answers, llm_judge_score
+from tests.fakes import LocalChatChain, LocalJudge
+
+
+def test_answers_keep_question_order_and_report_progress():
+    questions = [{"question": f"q{i}"} for i in range(6)]
+    reports = []
+    answers = generate_answers(questions, LocalChatChain(latency=0.01), concurrency=3,
+                               progress=lambda done, total, message: reports.append((done, total)))
+    assert answers == [f"Answer to: q{i}" for i in range(6)]
+    assert sorted(reports) == [(i, 6) for i in range(1, 7)]
+
+
+def test_answers_run_concurrently():
+    questions = [{"question": f"q{i}"} for i in range(8)]
+    start = time.perf_counter()
+    generate_answers(questions, LocalChatChain(latency=0.1), concurrency=8)
+    assert time.perf_counter() - start < 0.5
+
+
+def test_judge_score_parses_the_reply():
+    assert llm_judge_score("Q?", "red apple", "a red apple", judge=LocalJudge()) == 1.0
+    assert llm_judge_score("Q?", "red apple", "green pear", judge=LocalJudge()) == 0.0
+
+
+def test_judge_retries_rate_limits_only(monkeypatch):
+    monkeypatch.setattr(evaluation_utils, "JUDGE_BACKOFF_SECONDS", 0.0)
+    judge = LocalJudge(failures=[RuntimeError("429 Too Many Requests")] * 2)
+    assert llm_judge_score("Q?", "red", "red", judge=judge) == 1.0
+    assert judge.calls == 3
+
+    judge = LocalJudge(failures=[RuntimeError("invalid model")])
+    assert llm_judge_score("Q?", "red", "red", judge=judge) is None
+    assert judge.calls == 1
@@ -0,0 +1,58 @@
+# tests/test_hybrid_retriever.py
+from modules.hybrid_retriever import BM25Index, tokenize
+
+CHUNKS = {
+    "a:0": "The pump part AB-1234 needs a new seal every year.",
+    "a:1": "Release notes for version v2.1 of the controller firmware.",
+    "b:0": "The seal kit ships with gaskets and a manual.",
+}
+
+
+def build():
+    index = BM25Index()
+    for chunk_id, text in CHUNKS.items():
+        index.add(chunk_id, text)
+    return index
+
+
+def test_identifiers_are_indexed_whole_and_by_parts():
+    assert tokenize("AB-1234 v2.1") == ["ab-1234", "ab", "1234", "ab1234", "v2.1", "v2", "1", "v21"]
+
+
+def test_search_ranks_matching_chunks():
+    index = build()
+    for query in ["AB-1234", "AB1234", "1234", "ab"]:
+        assert index.search(query, k=1)[0][0] == "a:0"
+    assert {chunk_id for chunk_id, _ in index.search("seal", k=3)} == {"a:0", "b:0"}
+    assert index.search("nothing matches this") == []
+
+
+def test_remove_forgets_the_chunk():
+    index = build()
+    index.remove("a:0", CHUNKS["a:0"])
+    assert [chunk_id for chunk_id, _ in index.search("seal", k=3)] == ["b:0"]
+    assert "ab-1234" not in index.postings
+    assert index.total_length == sum(index.lengths.values())
+
+
+def test_remove_without_text_scans_the_vocabulary():
+    index = build()
+    index.remove("b:0")
+    assert all("b:0" not in docs for docs in index.postings.values())
+
+
+def test_re_adding_a_chunk_replaces_it():
+    index = build()
+    index.add("b:0", "Completely different words.")
+    assert [chunk_id for chunk_id, _ in index.search("seal", k=3)] == ["a:0"]
+
+
+def test_round_trip_through_bytes():
+    index = build()
+    restored = BM25Index.from_bytes(index.to_bytes())
+    assert restored.search("seal gaskets", k=3) == index.search("seal gaskets", k=3)
+
+
+def test_index_from_another_tokenizer_is_not_loaded():
+    stale = b'{"k1": 1.5, "b": 0.75, "postings": {}, "lengths": {}}'
+    assert BM25Index.from_bytes(stale) is None
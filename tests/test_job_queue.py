@@ -0,0 +1,93 @@
+# tests/test_job_queue.py
+import threading
+import time
+
+import pytest
+
+from modules import job_queue
+from modules.job_queue import (
+    ACTIVE, CANCELLED, DONE, FAILED, cancel_job, find_job, get_job, job_result, submit_job,
+)
+
+
+def wait_for(job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = get_job(job_id)
+        if job["status"] not in ACTIVE:
+            return job
+        time.sleep(0.01)
+    pytest.fail(f"job {job_id} still {job['status']}")
+
+
+def test_job_runs_and_reports_progress():
+    def work(n, progress):
+        for i in range(n):
+            progress(i + 1, n, f"step {i + 1}")
+        return {"total": n}
+
+    job_id = submit_job("test", work, 3)
+    job = wait_for(job_id)
+    assert (job["status"], job["done"], job["total"], job["message"]) == (DONE, 3, 3, "step 3")
+    assert job_result(job_id) == {"total": 3}
+    assert job_result(job_id) == {"total": 3}  # JSON results are persisted
+
+
+def test_results_json_cant_hold_are_handed_over_once():
+    value = object()
+    job_id = submit_job("test", lambda progress: value)
+    wait_for(job_id)
+    assert job_result(job_id) is value
+    assert job_result(job_id) is None
+
+
+def test_uncollected_results_are_capped(monkeypatch):
+    monkeypatch.setattr(job_queue, "MAX_RESULTS_IN_MEMORY", 2)
+    ids = [submit_job("test", lambda progress: object()) for _ in range(4)]
+    for job_id in ids:
+        wait_for(job_id)
+    assert len(job_queue._results) <= 2
+
+
+def test_failure_is_recorded():
+    def work(progress):
+        raise ValueError("boom")
+
+    job = wait_for(submit_job("test", work))
+    assert (job["status"], job["error"]) == (FAILED, "boom")
+
+
+def test_running_job_stops_at_its_next_progress_report():
+    started, release = threading.Event(), threading.Event()
+
+    def work(progress):
+        started.set()
+        release.wait(5)
+        progress(1, 2)
+        return "finished"
+
+    job_id = submit_job("test", work)
+    assert started.wait(5)
+    cancel_job(job_id)
+    release.set()
+    assert wait_for(job_id)["status"] == CANCELLED
+    assert job_result(job_id) is None
+
+
+def test_keyed_jobs_are_joined_only_while_active():
+    release = threading.Event()
+
+    def work(progress):
+        release.wait(5)
+        return "done"
+
+    first = submit_job("keyed", work, key="k")
+    assert submit_job("keyed", work, key="k") == first
+    assert find_job("keyed", "k") == first
+    release.set()
+    wait_for(first)
+
+    assert find_job("keyed", "k") is None
+    second = submit_job("keyed", work, key="k")
+    assert second != first
+    wait_for(second)
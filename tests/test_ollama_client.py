@@ -0,0 +1,65 @@
+# tests/test_ollama_client.py
+import pytest
+
+from modules.ollama_client import OllamaClient
+from modules.ollama_stub import STUB_EMBED_DIM, STUB_MODELS, StubHandler, start_stub_server, stub_reply
+from modules.practice_utils import parse_qa_stream
+
+
+@pytest.fixture(scope="module")
+def stub():
+    server, url = start_stub_server()
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(stub):
+    return OllamaClient(host=stub)
+
+
+def test_health_and_models(client):
+    assert client.is_available()
+    assert client.models() == STUB_MODELS
+
+
+def test_health_check_is_cached(client):
+    client.is_available()
+    seen = StubHandler.requests_seen
+    client.is_available()
+    assert StubHandler.requests_seen == seen
+    client.is_available(force=True)
+    assert StubHandler.requests_seen == seen + 1
+
+
+def test_unreachable_server_is_unavailable():
+    assert not OllamaClient(host="http://127.0.0.1:9", timeout=(0.5, 0.5)).is_available()
+
+
+def test_generate_and_stream_agree(client):
+    assert client.generate("hello", "gemma3:1b") == stub_reply("hello")
+    assert "".join(client.stream("hello", "gemma3:1b")).strip() == stub_reply("hello")
+
+
+def test_stream_lines_feed_the_qa_parser(client):
+    pairs = list(parse_qa_stream(client.stream_lines("notes", "gemma3:1b")))
+    assert len(pairs) == 5
+    assert pairs[0]["question"].startswith("Stub question")
+
+
+def test_embed(client):
+    first = client.embed("text", "nomic-embed-text:latest")
+    assert len(first) == STUB_EMBED_DIM
+    assert client.embed("text", "nomic-embed-text:latest") == first
+
+
+def test_errors_raise(stub):
+    client = OllamaClient(host=stub)
+    with pytest.raises(RuntimeError):
+        client._post("/api/unknown", {})
+
+
+def test_warm_up_loads_once(client):
+    client.warm_up("gemma3:1b", wait=True)
+    assert client.warm_up("gemma3:1b") is None
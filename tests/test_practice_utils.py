@@ -0,0 +1,70 @@
+# tests/test_practice_utils.py
+import pytest
+
+from modules import practice_utils
+from modules.practice_utils import parse_qa_stream
+
+
+def parse(text):
+    return [(qa["question"], qa["expected_answer"]) for qa in parse_qa_stream(text.splitlines())]
+
+
+@pytest.mark.parametrize("text", [
+    "Q1: What is X?\nA1: Y.",
+    "**Q1:** What is X?\n**A1:** Y.",
+    "1. Q: What is X?\nA: Y.",
+    "Question 1 - What is X?\nAnswer 1) Y.",
+    "Q1. What is X?\nA1. Y.",
+])
+def test_numbering_variants(text):
+    assert parse(text) == [("What is X?", "Y.")]
+
+
+def test_multiline_question_and_answer():
+    text = "Q1: What is\nX?\nA1: Y,\nand Z.\nQ2: Why?\nA2: Because."
+    assert parse(text) == [("What is X?", "Y, and Z."), ("Why?", "Because.")]
+
+
+def test_bare_letter_lines_continue_the_answer():
+    text = "Q1: Which options?\nA1: Two options:\na) first\nb) second\nQ2: And?\nA2: A-levels are exams.\nq: not a question"
+    assert parse(text) == [
+        ("Which options?", "Two options: a) first b) second"),
+        ("And?", "A-levels are exams. q: not a question"),
+    ]
+
+
+def test_numbered_marker_ends_the_answer():
+    assert parse("Q: One?\nA: 1.\nQ: Two?\nA: 2.") == [("One?", "1."), ("Two?", "2.")]
+
+
+@pytest.mark.parametrize("text", [
+    "Q1: What is X? A1: Y.\nQ2: What is Z? A2: W.",
+    "Q1: What is X? Answer: Y.\nQ2: What is Z? **A2:** W.",
+])
+def test_answer_on_the_question_line(text):
+    assert parse(text) == [("What is X?", "Y."), ("What is Z?", "W.")]
+
+
+def test_incomplete_pairs_are_dropped():
+    assert parse("Intro line\nQ1: Unanswered?\nQ2: Answered?\nA2: Yes.\nQ3: Last?") == [("Answered?", "Yes.")]
+
+
+def test_pairs_are_yielded_as_soon_as_complete():
+    read = []
+
+    def lines():
+        for line in ["Q1: One?", "A1: 1.", "Q2: Two?", "A2: 2."]:
+            read.append(line)
+            yield line
+
+    pairs = parse_qa_stream(lines())
+    assert next(pairs) == {"question": "One?", "expected_answer": "1."}
+    assert read == ["Q1: One?", "A1: 1.", "Q2: Two?"]
+
+
+def test_generate_eval_questions_raises_when_nothing_comes_back(monkeypatch):
+    monkeypatch.setattr(practice_utils, "is_ollama_available", lambda: True)
+    monkeypatch.setattr(practice_utils, "get_client", lambda: type("Client", (), {"warm_up": lambda self, m: None})())
+    monkeypatch.setattr(practice_utils, "generate_across_document", lambda *args: [])
+    with pytest.raises(RuntimeError):
+        practice_utils.generate_eval_questions("some text")
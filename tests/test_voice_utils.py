@@ -0,0 +1,55 @@
+# tests/test_voice_utils.py
+import io
+import wave
+
+import pytest
+
+from modules.voice_utils import clean_text_for_tts, join_audio, split_for_speech, synthesize
+
+
+@pytest.mark.parametrize("text, spoken", [
+    ("## Key findings", "Key findings"),
+    ("* **Bold** and *italic*", "Bold and italic"),
+    ("***nested***", "nested"),
+    ("- See [the report](https://example.com) now", "See the report now"),
+    ("![diagram](a.png) ~~old~~ new", "diagram old new"),
+    ("> Quoted line", "Quoted line"),
+    ("```python\nprint(1)\n```", "print(1)"),
+    ("---", ""),
+    ("__underline__ but snake_case stays", "underline but snake_case stays"),
+    ("C# clients when a > b", "C# clients when a > b"),
+    ("1. Numbered items keep their number", "1. Numbered items keep their number"),
+])
+def test_clean_text_for_tts(text, spoken):
+    assert clean_text_for_tts(text) == spoken
+
+
+def test_split_for_speech_groups_sentences_up_to_the_limit():
+    text = "One. Two! Three?\nFour."
+    assert split_for_speech(text, max_chars=10) == ["One. Two!", "Three?", "Four."]
+    assert split_for_speech(text, max_chars=300) == ["One. Two! Three? Four."]
+    assert split_for_speech("  \n ") == []
+
+
+def _wav(frames):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(8000)
+        out.writeframes(b"\x00\x01" * frames)
+    return buffer.getvalue(), "audio/wav"
+
+
+def test_join_audio_makes_one_clip():
+    assert join_audio([(b"ab", "audio/mp3"), (b"cd", "audio/mp3")]) == (b"abcd", "audio/mp3")
+    audio, mime = join_audio([_wav(100), _wav(50)])
+    assert mime == "audio/wav"
+    with wave.open(io.BytesIO(audio)) as clip:
+        assert clip.getnframes() == 150
+    assert join_audio([]) == (b"", "audio/mp3")
+
+
+def test_offline_engine_refuses_other_languages():
+    with pytest.raises(RuntimeError):
+        synthesize("Bonjour", lang="fr", engine="pyttsx3")